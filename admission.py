@@ -0,0 +1,112 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# --- Admission Control ---
+# Checked at the top of /chat and /chat/stream, before any LLM or database work:
+# each user_id gets a token bucket (CHAT_RATE_PER_USER requests per second, bursts
+# of CHAT_BURST_PER_USER) and the worker runs at most CHAT_MAX_IN_FLIGHT chats at
+# once. Rejections are immediate 429 / 503 responses with Retry-After.
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request is shed. Carries the HTTP status and Retry-After seconds.
+    """
+
+    def __init__(self, status_code: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """
+        Takes one token. Returns 0 on success, otherwise the seconds until a token is available.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    Per-user token buckets (LRU-bounded) plus a global limit on in-flight requests.
+    """
+
+    def __init__(self):
+        self.rate = float(os.getenv("CHAT_RATE_PER_USER", "1"))
+        self.burst = float(os.getenv("CHAT_BURST_PER_USER", "5"))
+        self.max_users = int(os.getenv("CHAT_RATE_LIMIT_USERS", "10000"))
+        self.max_in_flight = int(os.getenv("CHAT_MAX_IN_FLIGHT", "64"))
+        self.overload_retry_after = int(os.getenv("CHAT_OVERLOAD_RETRY_AFTER", "1"))
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.admitted = 0
+        self.rate_limited = 0
+        self.overloaded = 0
+
+    def admit(self, user_id: str):
+        """
+        Reserves an in-flight slot for user_id, or raises AdmissionRejected.
+        Returns the function that frees the slot; calling it more than once is harmless.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                self.overloaded += 1
+                raise AdmissionRejected(503, self.overload_retry_after, "The service is busy. Please retry shortly.")
+
+            bucket = self._buckets.get(user_id)
+            if bucket is None:
+                bucket = self._buckets[user_id] = TokenBucket(self.rate, self.burst, now)
+                if len(self._buckets) > self.max_users:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(user_id)
+            wait = bucket.take(now)
+            if wait:
+                self.rate_limited += 1
+                raise AdmissionRejected(429, max(1, math.ceil(wait)), "Too many requests for this user.")
+
+            self.in_flight += 1
+            self.admitted += 1
+
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            with self._lock:
+                if not released:
+                    released = True
+                    self.in_flight -= 1
+
+        return release
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "admitted": self.admitted,
+                "shed_rate_limited": self.rate_limited,
+                "shed_overloaded": self.overloaded,
+                "tracked_users": len(self._buckets),
+            }
+
+
+admission = AdmissionController()
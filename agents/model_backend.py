@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import AsyncGenerator
+
+from google.adk.models import BaseLlm, Gemini, LlmRequest, LlmResponse
+from google.genai import types
+from pydantic import PrivateAttr
+
+# --- Model Backends ---
+# MODEL_BACKEND selects what the agents talk to:
+#   gemini (default) - the real Gemini model named by each agent
+#   stub             - a deterministic local stand-in, for load tests and offline runs
+#   record           - Gemini, with every request/response pair appended to MODEL_RECORDING_PATH
+#   replay           - serves responses from MODEL_RECORDING_PATH; no network access needed
+
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "gemini")
+MODEL_RECORDING_PATH = os.getenv("MODEL_RECORDING_PATH", "model_recordings.jsonl")
+# "recorded" replays the original model latency; a number is a fixed delay in seconds.
+REPLAY_LATENCY = os.getenv("REPLAY_LATENCY", "0")
+_recording_lock = threading.Lock()
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_DATE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+_REASON = re.compile(r"\b(?:reason(?:\s+is)?\s*[:\-]?|because(?:\s+of)?|due\s+to)\s+(.+?)\s*[.!?]*$", re.IGNORECASE)
+
+# Sub-agent chosen by the stub orchestrator, by keyword (first match wins).
+_STUB_ROUTES = [
+    (re.compile(r"\bsend\b", re.IGNORECASE), "EmailSendAgent"),
+    (re.compile(r"\b(?:draft|write|compose)\b", re.IGNORECASE), "EmailDraftAgent"),
+    (re.compile(r"\b(?:balance|how many days|leave left)\b", re.IGNORECASE), "BalanceCheckAgent"),
+]
+
+
+def _latest_user_text(llm_request: LlmRequest) -> str:
+    for content in reversed(llm_request.contents or []):
+        if content.role == "user":
+            text = " ".join(part.text for part in content.parts or [] if part.text)
+            # ADK shows other agents' turns to a sub-agent as "For context: ..." user messages.
+            if text and not text.startswith("For context:"):
+                return text
+    return ""
+
+
+def _text(text: str) -> types.Content:
+    return types.Content(role="model", parts=[types.Part(text=text)])
+
+
+def _call(name: str, args: dict) -> types.Content:
+    return types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(name=name, args=args))])
+
+
+class StubLlm(BaseLlm):
+    """
+    Deterministic stand-in for Gemini. Routes with keywords, calls each
+    specialist's tool with arguments parsed from the message and echoes tool
+    results, optionally after a fixed simulated latency.
+    """
+
+    model: str = "stub"
+    latency: float = 0.0
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return [r"stub.*"]
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        yield LlmResponse(content=self._respond(llm_request))
+
+    def _respond(self, llm_request: LlmRequest) -> types.Content:
+        contents = llm_request.contents or []
+        latest = contents[-1] if contents else None
+        if latest is not None:
+            for part in latest.parts or []:
+                if part.function_response:
+                    result = json.dumps(part.function_response.response, default=str)
+                    return _text(f"{part.function_response.name} returned: {result}")
+
+        message = _latest_user_text(llm_request)
+        tools = set(llm_request.tools_dict) - {"transfer_to_agent"}
+        if not tools:
+            for pattern, agent_name in _STUB_ROUTES:
+                if pattern.search(message):
+                    return _call("transfer_to_agent", {"agent_name": agent_name})
+            return _text(f"Here is the edited draft: {message}")
+
+        emails = _EMAIL.findall(message)
+        dates = sorted(_DATE.findall(message))
+        employee_email = emails[0] if emails else "employee@example.com"
+        if "get_leave_balance" in tools:
+            return _call("get_leave_balance", {"employee_email": employee_email})
+        if "draft_leave_email" in tools:
+            reason = _REASON.search(message)
+            return _call("draft_leave_email", {
+                "employee_email": employee_email,
+                "start_date": dates[0] if dates else "2025-01-01",
+                "end_date": dates[-1] if dates else "2025-01-01",
+                "reason": reason.group(1) if reason else "personal reasons",
+            })
+        if "send_email" in tools:
+            return _call("send_email", {"recipient_email": employee_email, "subject": "Leave request", "body": message})
+        return _text("Done.")
+
+
+# Values in tool results that differ on every run, such as the outbox id in
+# send_email's "(reference #123)", masked so a replay still finds the recording.
+_VOLATILE_TOOL_RESULTS = [
+    (re.compile(r"(reference #)\d+"), r"\1<id>"),
+]
+
+
+def _mask_volatile(value):
+    if isinstance(value, str):
+        for pattern, replacement in _VOLATILE_TOOL_RESULTS:
+            value = pattern.sub(replacement, value)
+        return value
+    if isinstance(value, dict):
+        return {key: _mask_volatile(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_mask_volatile(item) for item in value]
+    return value
+
+
+def request_key(llm_request: LlmRequest) -> str:
+    """
+    Stable hash of what the model is asked: model, system instruction, messages
+    and tool names. Function-call ids are random per run, so they are left out,
+    and run-specific values in tool results are masked.
+    """
+    contents = []
+    for content in llm_request.contents or []:
+        dumped = content.model_dump(mode="json", exclude_none=True)
+        for part in dumped.get("parts", []):
+            part.get("function_call", {}).pop("id", None)
+            function_response = part.get("function_response")
+            if function_response:
+                function_response.pop("id", None)
+                function_response["response"] = _mask_volatile(function_response.get("response"))
+        contents.append(dumped)
+    system_instruction = llm_request.config.system_instruction if llm_request.config else None
+    canonical = {
+        "model": llm_request.model,
+        "system_instruction": system_instruction if isinstance(system_instruction, str) else repr(system_instruction),
+        "contents": contents,
+        "tools": sorted(llm_request.tools_dict),
+    }
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class RecordingLlm(BaseLlm):
+    """
+    Calls Gemini and appends every request/response pair to a JSON Lines file.
+    """
+
+    path: str = MODEL_RECORDING_PATH
+    _inner: BaseLlm = PrivateAttr(default=None)
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        if self._inner is None:
+            self._inner = Gemini(model=self.model)
+        key = request_key(llm_request)
+        started = time.perf_counter()
+        responses = []
+        async for response in self._inner.generate_content_async(llm_request, stream=stream):
+            responses.append(response.model_dump(mode="json", exclude_none=True))
+            yield response
+
+        record = {
+            "key": key,
+            "model": self.model,
+            "latency": time.perf_counter() - started,
+            "responses": responses,
+        }
+        line = json.dumps(record, default=str) + "\n"
+        with _recording_lock, open(self.path, "a", encoding="utf-8") as recording:
+            recording.write(line)
+
+
+class _ReplayIndex:
+    """
+    Byte offsets of every recording, grouped by request key. Only the index is
+    kept in memory; records are read from disk when they are served.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offsets = {}
+        self.served = {}
+        self._lock = threading.Lock()
+        with open(path, "rb") as recording:
+            offset = recording.tell()
+            for line in iter(recording.readline, b""):
+                if line.strip():
+                    self.offsets.setdefault(json.loads(line)["key"], []).append(offset)
+                offset = recording.tell()
+
+    def next_record(self, key: str) -> dict:
+        """
+        Returns the recordings for a key in the order they were captured, then wraps around.
+        """
+        with self._lock:
+            offsets = self.offsets.get(key)
+            if not offsets:
+                raise LookupError(f"No recorded model response for request {key[:12]} in {self.path}")
+            count = self.served.get(key, 0)
+            self.served[key] = count + 1
+        with open(self.path, "rb") as recording:
+            recording.seek(offsets[count % len(offsets)])
+            return json.loads(recording.readline())
+
+
+_replay_indexes = {}
+_replay_indexes_lock = threading.Lock()
+
+
+def _replay_index(path: str) -> _ReplayIndex:
+    with _replay_indexes_lock:
+        if path not in _replay_indexes:
+            _replay_indexes[path] = _ReplayIndex(path)
+        return _replay_indexes[path]
+
+
+class ReplayLlm(BaseLlm):
+    """
+    Serves recorded responses for identical requests, with optional simulated latency.
+    Raises LookupError for a request that was never recorded.
+    """
+
+    path: str = MODEL_RECORDING_PATH
+    latency: str = REPLAY_LATENCY
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        record = _replay_index(self.path).next_record(request_key(llm_request))
+        delay = record["latency"] if self.latency == "recorded" else float(self.latency)
+        if delay:
+            await asyncio.sleep(delay)
+        for response in record["responses"]:
+            yield LlmResponse.model_validate(response)
+
+
+def get_model(model_name: str):
+    """
+    Returns the model an agent should use: the Gemini model name itself, or a
+    local backend instance when MODEL_BACKEND says so.
+    """
+    if MODEL_BACKEND == "stub":
+        return StubLlm(model=f"stub-{model_name}", latency=float(os.getenv("STUB_MODEL_LATENCY", "0")))
+    if MODEL_BACKEND == "record":
+        return RecordingLlm(model=model_name)
+    if MODEL_BACKEND == "replay":
+        return ReplayLlm(model=model_name)
+    if MODEL_BACKEND != "gemini":
+        raise ValueError(f"Unknown MODEL_BACKEND: {MODEL_BACKEND}")
+    return model_name
@@ -1,5 +1,9 @@
 import os
 from google.adk.agents import LlmAgent
+from session_memory import session_memory
+
+from .model_backend import get_model
+from .routing_cache import routing_cache
 
 from .specialist_agents import (
     BalanceCheckAgent,
@@ -10,7 +14,10 @@ from .specialist_agents import (
 # --- The Orchestrator (Manager) Agent ---
 OrchestratorAgent = LlmAgent(
     name="OrchestratorAgent",
-    model="gemini-2.5-flash",
+    model=get_model("gemini-2.5-flash"),
+    # A cached routing decision short-circuits the model call before the prompt is trimmed.
+    before_model_callback=[routing_cache.before_model, session_memory.trim_history],
+    after_model_callback=routing_cache.after_model,
     
     sub_agents=[
         BalanceCheckAgent,
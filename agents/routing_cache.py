@@ -0,0 +1,141 @@
+import hashlib
+import os
+import re
+import threading
+
+from google.adk.models import LlmResponse
+from google.genai import types
+
+from cache import TTLCache
+
+# --- Routing Decision Cache ---
+# Maps a normalised user message, together with the turn before it, to the sub-agent
+# the orchestrator delegated it to, so repeated phrasings skip the routing LLM call.
+# Only the delegation is cached, never the final answer: the chosen specialist
+# still runs normally.
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_DATE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PUNCTUATION = re.compile(r"[^\w\s<>]")
+
+
+def normalise_message(message: str) -> str:
+    """
+    Lower-cases the message and masks details that never affect routing
+    (emails, dates, numbers, punctuation, extra whitespace).
+    """
+    message = _EMAIL.sub("<email>", message.lower())
+    message = _DATE.sub("<date>", message)
+    message = _NUMBER.sub("<n>", message)
+    message = _PUNCTUATION.sub(" ", message)
+    return " ".join(message.split())
+
+
+def previous_turn_digest(content) -> str:
+    """
+    Hash of the normalised text and function calls of one conversation turn.
+    """
+    pieces = [content.role or ""]
+    for part in content.parts or []:
+        if part.text:
+            pieces.append(normalise_message(part.text))
+        if part.function_call:
+            pieces.append(f"{part.function_call.name}:{sorted((part.function_call.args or {}).items())}")
+        if part.function_response:
+            pieces.append(f"{part.function_response.name}:response")
+    return hashlib.sha256("\x1f".join(pieces).encode()).hexdigest()[:16]
+
+
+def agent_fingerprint(agent) -> str:
+    """
+    Hash of everything that can change a routing decision: model, instruction
+    and sub-agents. Any change produces new cache keys.
+    """
+    instruction = agent.instruction if isinstance(agent.instruction, str) else repr(agent.instruction)
+    parts = [str(agent.model), instruction] + sorted(sub_agent.name for sub_agent in agent.sub_agents)
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()[:16]
+
+
+class RoutingCache:
+    """
+    before/after model callbacks for the orchestrator that cache its
+    transfer_to_agent decisions.
+    """
+
+    def __init__(self):
+        self.cache = TTLCache(
+            maxsize=int(os.getenv("ROUTING_CACHE_SIZE", "10000")),
+            ttl=float(os.getenv("ROUTING_CACHE_TTL", "3600")),
+        )
+        self._fingerprint = None
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _key(self, callback_context, llm_request):
+        contents = list(llm_request.contents or [])
+        if not contents:
+            return None
+        latest = contents[-1]
+        parts = latest.parts or []
+        if latest.role != "user" or not parts or any(part.function_response or part.function_call for part in parts):
+            return None
+        message = " ".join(part.text for part in parts if part.text)
+        if not message:
+            return None
+
+        fingerprint = agent_fingerprint(callback_context._invocation_context.agent)
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                # Instructions or model changed: every cached decision is stale.
+                self.cache.clear()
+                self._fingerprint = fingerprint
+        # Follow-ups like "yes" or "make it shorter" route wherever the previous turn
+        # went, so the key includes that turn (its text and any tool or transfer calls).
+        previous = previous_turn_digest(contents[-2]) if len(contents) > 1 else ""
+        return (fingerprint, previous, normalise_message(message))
+
+    def before_model(self, callback_context, llm_request):
+        key = self._key(callback_context, llm_request)
+        if key is None:
+            return None
+
+        agent_name = self.cache.get(key)
+        if agent_name is None:
+            with self._lock:
+                if len(self._pending) > 10000:
+                    # Model calls that failed never reach after_model; drop their keys.
+                    self._pending.clear()
+                self._pending[callback_context.invocation_id] = key
+            return None
+
+        return LlmResponse(content=types.Content(
+            role="model",
+            parts=[types.Part(function_call=types.FunctionCall(
+                name="transfer_to_agent", args={"agent_name": agent_name}
+            ))],
+        ))
+
+    def after_model(self, callback_context, llm_response):
+        if llm_response.partial:
+            # Streaming chunks; the decision is read from the final response.
+            return None
+        with self._lock:
+            key = self._pending.pop(callback_context.invocation_id, None)
+        if key is None or not llm_response.content:
+            return None
+
+        for part in llm_response.content.parts or []:
+            call = part.function_call
+            if call and call.name == "transfer_to_agent" and (call.args or {}).get("agent_name"):
+                self.cache.set(key, call.args["agent_name"])
+                break
+        return None
+
+    def stats(self) -> dict:
+        stats = self.cache.stats()
+        stats["llm_calls_skipped"] = stats["hits"]
+        return stats
+
+
+routing_cache = RoutingCache()
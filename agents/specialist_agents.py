@@ -1,16 +1,21 @@
 import os
 from google.adk.agents import LlmAgent
 from email_utils import draft_leave_email, send_email
-from database import get_leave_balance
+from async_database import get_leave_balance
+from tool_executor import email_tool_pool
+from session_memory import session_memory
 from pydantic import ConfigDict
 
+from .model_backend import get_model
+
 MODEL_NAME = "gemini-2.5-flash"
 
 # --- Specialist 1: The Balance Checker ---
 BalanceCheckAgent = LlmAgent(
     name="BalanceCheckAgent",
     
-    model=MODEL_NAME,
+    model=get_model(MODEL_NAME),
+    before_model_callback=session_memory.trim_history,
     tools=[get_leave_balance],
     instruction=(
         "You are a specialist. Your ONLY job is to check an employee's leave balance. "
@@ -22,8 +27,9 @@ BalanceCheckAgent = LlmAgent(
 EmailDraftAgent = LlmAgent(
     name="EmailDraftAgent",
     
-    model=MODEL_NAME,
-    tools=[draft_leave_email],
+    model=get_model(MODEL_NAME),
+    before_model_callback=session_memory.trim_history,
+    tools=[email_tool_pool.wrap(draft_leave_email)],
     instruction=(
         "You are a specialist. Your ONLY job is to draft a professional leave request email. "
         "When you are called, you must use the `draft_leave_email` tool."
@@ -34,8 +40,9 @@ EmailDraftAgent = LlmAgent(
 EmailSendAgent = LlmAgent(
     name="EmailSendAgent",
     
-    model=MODEL_NAME,
-    tools=[send_email],
+    model=get_model(MODEL_NAME),
+    before_model_callback=session_memory.trim_history,
+    tools=[email_tool_pool.wrap(send_email)],
     instruction=(
         "You are a specialist. Your ONLY job is to send an email. "
         "When you are called, you must use the `send_email` tool."
@@ -1,45 +1,419 @@
-import google.adk as adk
-from fastapi import FastAPI
-from pydantic import BaseModel
+import io
+import json
+import logging
+import uuid
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Literal
+
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.datastructures import Headers, MutableHeaders
+from pydantic import BaseModel, Field, model_validator
+from sqlalchemy import exc as sqlalchemy_exc
 from dotenv import load_dotenv
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+# --- Load Environment Variables ---
+load_dotenv()
+
+# Install logging and the tracer provider before the agents and engines start using them.
+import log_config
+import tracing
+log_config.setup_logging()
+tracing.configure()
 
 # We only need to import the top-level Orchestrator
 from agents.orchestrator_agent import OrchestratorAgent
+from agents.routing_cache import routing_cache
+from admission import AdmissionRejected, admission
+from intent_router import intent_router
+from leave_import import import_leave_requests
+from setup_database import report_schema_status
+from session_memory import session_memory
+from singleflight import single_flight
+from tool_executor import db_tool_pool, email_tool_pool, tool_pool_stats
+from async_database import (
+    async_engine,
+    get_leave_balance,
+    get_leave_balance_as_of,
+    create_pending_leave_request,
+    update_leave_status,
+    bulk_update_leave_status,
+)
+from database import engine, balance_cache_stats
+from db_config import pool_stats
+from email_client import close_email_client, email_client_stats
+from email_utils import deliver_email
+from outbox import OutboxWorker
+from digest import DIGEST_MODE, DigestWorker
+import metrics
 
-# --- Load Environment Variables ---
-load_dotenv()
+APP_NAME = "leave_management"
+logger = logging.getLogger("app")
 
 # --- Pydantic Models ---
 class ChatRequest(BaseModel):
     message: str
     user_id: str = "adk_test_user"
 
+class BalanceResponse(BaseModel):
+    employee_email: str
+    leave_balance: float
+    as_of: date | None = None
+
+class LeaveRequestCreate(BaseModel):
+    employee_email: str
+    start_date: date
+    end_date: date
+    reason: str
+
+    @model_validator(mode="after")
+    def check_dates(self):
+        if self.end_date < self.start_date:
+            raise ValueError("end_date must not be before start_date")
+        return self
+
+class LeaveRequestCreated(BaseModel):
+    request_id: int
+
+class DecisionRequest(BaseModel):
+    decision: Literal["approved", "rejected"]
+
+class DecisionResponse(BaseModel):
+    request_id: int
+    employee_email: str | None
+    status: str
+
+class BulkDecisionRequest(BaseModel):
+    request_ids: list[int] = Field(min_length=1, max_length=5000)
+    decision: Literal["approved", "rejected"]
+
+class DecisionOutcome(BaseModel):
+    request_id: int
+    employee_email: str | None
+    status: str | None
+    changed: bool
+
+class BulkDecisionResponse(BaseModel):
+    results: list[DecisionOutcome]
+
+# --- Shared Agent Runtime ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warn early if the schema is behind or hot-path indexes are missing.
+    await db_tool_pool.run(report_schema_status)
+
+    # Build the runner and session service once; every /chat call reuses them.
+    session_service = InMemorySessionService()
+    app.state.session_service = session_service
+    app.state.runner = Runner(
+        agent=OrchestratorAgent,
+        app_name=APP_NAME,
+        session_service=session_service,
+    )
+    session_memory.attach(session_service, APP_NAME)
+    logger.info("ADK runner and session service initialised")
+
+    # Emails are delivered from the outbox in the background, off the request path.
+    app.state.outbox_worker = OutboxWorker(async_engine, deliver_email)
+    app.state.outbox_worker.start()
+
+    # NOTIFICATION_MODE=digest batches notifications into one email per recipient per window.
+    app.state.digest_worker = DigestWorker(async_engine) if DIGEST_MODE else None
+    if app.state.digest_worker:
+        app.state.digest_worker.start()
+        metrics.register("digest", app.state.digest_worker.stats)
+
+    metrics.register("db_pool", lambda: pool_stats(engine))
+    metrics.register("async_db_pool", lambda: pool_stats(async_engine))
+    metrics.register("balance_cache", balance_cache_stats)
+    metrics.register("intent_router", intent_router.stats)
+    metrics.register("tool_pools", tool_pool_stats)
+    metrics.register("outbox", app.state.outbox_worker.stats)
+    metrics.register("email_client", email_client_stats)
+    metrics.register("session_memory", session_memory.stats)
+    metrics.register("routing_cache", routing_cache.stats)
+    metrics.register("span_latency", tracing.latency_stats)
+    metrics.register("logging", log_config.logging_stats)
+    metrics.register("admission", admission.stats)
+    metrics.register("single_flight", single_flight.stats)
+    yield
+    if app.state.digest_worker:
+        await app.state.digest_worker.stop()
+    await app.state.outbox_worker.stop()
+    await close_email_client()
+    db_tool_pool.shutdown()
+    email_tool_pool.shutdown()
+    tracing.shutdown()
+
+def describe_event(event) -> list[dict]:
+    """
+    Converts one ADK event into the SSE payloads sent by /chat/stream:
+    routing decisions, tool calls, tool results and (partial) model text.
+    """
+    payloads = []
+    if event.actions and event.actions.transfer_to_agent:
+        payloads.append({"type": "routing", "agent": event.author, "to": event.actions.transfer_to_agent})
+    for call in event.get_function_calls():
+        if call.name != "transfer_to_agent":
+            payloads.append({"type": "tool_call", "agent": event.author, "tool": call.name, "args": call.args})
+    for response in event.get_function_responses():
+        if response.name != "transfer_to_agent":
+            payloads.append({"type": "tool_result", "agent": event.author, "tool": response.name, "result": response.response})
+    if event.content and event.content.parts:
+        text = "".join(part.text or "" for part in event.content.parts)
+        if text:
+            kind = "text" if event.partial else "message"
+            payloads.append({"type": kind, "agent": event.author, "text": text})
+    return payloads
+
+async def remember_fast_reply(session_service, user_id: str, message: str, reply: str) -> None:
+    """
+    Appends a fast-path exchange to the user's ADK session, so follow-ups that go
+    to the agents ("make it more casual") find the draft in the conversation history.
+    """
+    session = await session_memory.get_session(user_id)
+    invocation_id = Event.new_id()
+    for author, role, text in (("user", "user", message), (OrchestratorAgent.name, "model", reply)):
+        await session_service.append_event(session, Event(
+            invocation_id=invocation_id,
+            author=author,
+            content=types.Content(role=role, parts=[types.Part(text=text)]),
+        ))
+
+def sse(payload: dict) -> str:
+    return f"event: {payload['type']}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+def admit_chat(user_id: str):
+    """
+    Sheds the request with 429/503 and Retry-After before any work starts.
+    Returns the function that frees the in-flight slot.
+    """
+    try:
+        return admission.admit(user_id)
+    except AdmissionRejected as e:
+        logger.warning("Shed chat request with status %s", e.status_code, extra={"sampled": True})
+        raise HTTPException(status_code=e.status_code, detail=e.reason, headers={"Retry-After": str(e.retry_after)})
+
 # --- FastAPI App Initialization ---
 app = FastAPI(
     title="ADK Leave Management System",
     description="An API for managing leave requests using a multi-agent system.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+class TraceRequests:
+    """
+    Opens the root span of every request; agent, tool and SQL spans nest under it.
+    Pure ASGI, so the span ends after the last body chunk is sent and streamed
+    responses (/chat/stream) are measured end to end, not just to their headers.
+    Also assigns the request id that is attached to every log record and echoed
+    back in the X-Request-ID header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get("X-Request-ID") or uuid.uuid4().hex
+        log_config.request_id_var.set(request_id)
+        method, path = scope["method"], scope["path"]
+        with tracing.tracer.start_as_current_span(
+            f"{method} {path}",
+            attributes={"span.type": "http", "http.method": method, "http.target": path},
+        ) as span:
+            async def send_with_request_id(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    MutableHeaders(scope=message).append("X-Request-ID", request_id)
+                await send(message)
+
+            await self.app(scope, receive, send_with_request_id)
+            route = scope.get("route")
+            if route is not None:
+                # Name by route template so /leave-requests/{request_id} is one series.
+                span.update_name(f"{method} {route.path}")
+                span.set_attribute("http.route", route.path)
+            span.set_attribute("http.request_id", request_id)
+
+app.add_middleware(TraceRequests)
+
+@app.exception_handler(sqlalchemy_exc.OperationalError)
+@app.exception_handler(sqlalchemy_exc.InterfaceError)
+@app.exception_handler(sqlalchemy_exc.TimeoutError)
+async def database_unavailable(request: Request, exc: Exception):
+    """
+    Connection failures, statement timeouts and pool exhaustion are outages, not
+    business outcomes: answer 503 so integrations retry instead of giving up.
+    """
+    logger.error("Database unavailable: %s", exc)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "The database is unavailable. Please retry shortly."},
+        headers={"Retry-After": "1"},
+    )
+
 # --- API Endpoints ---
 @app.get("/")
 async def root():
     return {"message": "Welcome to the ADK Leave Management System!"}
 
+@app.get("/metrics")
+async def get_metrics():
+    return metrics.collect()
+
 @app.post("/chat")
 async def handle_chat(request: ChatRequest):
-    print(f"Received message from '{request.user_id}': '{request.message}'")
-    
-    runner = adk.Runner()
-    result = await runner.run_async(
-        agent=OrchestratorAgent,
-        prompt=request.message
+    log_config.user_id_var.set(request.user_id)
+    logger.info("Received chat message", extra={"sampled": True})
+
+    release = admit_chat(request.user_id)
+    try:
+        # Clear balance/draft requests are answered locally without any LLM call.
+        fast_reply = await intent_router.try_handle(request.message, request.user_id)
+        if fast_reply is not None:
+            logger.info("Answered on the fast path", extra={"sampled": True})
+            await remember_fast_reply(app.state.session_service, request.user_id, request.message, fast_reply)
+            return {"reply": fast_reply}
+
+        session = await session_memory.get_session(request.user_id)
+        new_message = types.Content(role="user", parts=[types.Part(text=request.message)])
+
+        final_response = None
+        async for event in app.state.runner.run_async(
+            user_id=request.user_id,
+            session_id=session.id,
+            new_message=new_message,
+        ):
+            if event.is_final_response() and event.content and event.content.parts:
+                final_response = "".join(part.text or "" for part in event.content.parts)
+
+        logger.info("Agent response ready", extra={"sampled": True})
+        return {"reply": final_response}
+    finally:
+        release()
+
+@app.post("/chat/stream")
+async def handle_chat_stream(request: ChatRequest):
+    """
+    Same conversation as /chat, but agent events are pushed as Server-Sent Events
+    while the agents run. The last event is always 'reply' with the final text.
+    """
+    log_config.user_id_var.set(request.user_id)
+    logger.info("Received streaming chat message", extra={"sampled": True})
+    release = admit_chat(request.user_id)
+
+    async def event_stream():
+        try:
+            async for chunk in agent_events():
+                yield chunk
+        finally:
+            release()
+
+    async def agent_events():
+        fast_reply = await intent_router.try_handle(request.message, request.user_id)
+        if fast_reply is not None:
+            await remember_fast_reply(app.state.session_service, request.user_id, request.message, fast_reply)
+            yield sse({"type": "reply", "reply": fast_reply})
+            return
+
+        session = await session_memory.get_session(request.user_id)
+        new_message = types.Content(role="user", parts=[types.Part(text=request.message)])
+
+        final_response = None
+        try:
+            async for event in app.state.runner.run_async(
+                user_id=request.user_id,
+                session_id=session.id,
+                new_message=new_message,
+                run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+            ):
+                for payload in describe_event(event):
+                    yield sse(payload)
+                if event.is_final_response() and event.content and event.content.parts:
+                    final_response = "".join(part.text or "" for part in event.content.parts)
+        except Exception:
+            logger.exception("Error while streaming agent response")
+            yield sse({"type": "error", "error": "The agent failed to complete the request."})
+            return
+
+        yield sse({"type": "reply", "reply": final_response})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Frees the slot even if the client disconnects before the stream starts.
+        background=BackgroundTask(release),
+    )
+
+# --- Structured Endpoints ---
+# Typed endpoints for integrations (HR portal, Slack bot) that call the database
+# functions directly instead of going through the agents and the LLM.
+
+@app.get("/employees/{employee_email}/balance", response_model=BalanceResponse)
+async def get_employee_balance(employee_email: str, as_of: date | None = None):
+    """
+    Returns the current balance, or the balance at the end of `as_of` when given.
+    """
+    if as_of is None:
+        balance = await get_leave_balance(employee_email)
+        if balance is None:
+            raise HTTPException(status_code=404, detail=f"No employee found with email {employee_email}.")
+    else:
+        balance = await get_leave_balance_as_of(employee_email, as_of.isoformat())
+        if balance is None:
+            raise HTTPException(status_code=404, detail=f"No leave balance for {employee_email} on {as_of}.")
+    return {"employee_email": employee_email, "leave_balance": balance, "as_of": as_of}
+
+@app.post("/leave-requests", response_model=LeaveRequestCreated, status_code=201)
+async def create_leave_request(request: LeaveRequestCreate):
+    request_id = await create_pending_leave_request(
+        request.employee_email, request.start_date.isoformat(), request.end_date.isoformat(), request.reason
     )
-    
-    final_response = result.output
-    
-    print(f"ADK Agent Response: {final_response}")
-    return {"reply": final_response}
+    if request_id is None:
+        # Dates are already validated, so the employee is unknown or their balance is too low.
+        if await get_leave_balance(request.employee_email) is None:
+            raise HTTPException(status_code=404, detail=f"No employee found with email {request.employee_email}.")
+        raise HTTPException(status_code=422, detail="The leave request exceeds the employee's leave balance.")
+    return {"request_id": request_id}
 
+@app.post("/leave-requests/{request_id}/decision", response_model=DecisionResponse)
+async def decide_leave_request(request_id: int, request: DecisionRequest):
+    result = await update_leave_status(request_id, request.decision)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No leave request found with ID {request_id}.")
+    return {"request_id": request_id, **result}
 
+@app.post("/leave-requests/decisions", response_model=BulkDecisionResponse)
+async def bulk_decide_leave_requests(request: BulkDecisionRequest):
+    """
+    Approves or rejects many leave requests in one transaction.
+    Unknown ids are reported with status null; already-decided ones keep their status.
+    """
+    return {"results": await bulk_update_leave_status(request.request_ids, request.decision)}
 
+@app.post("/leave-requests/import")
+async def import_leave_requests_file(file: UploadFile = File(...), format: Literal["csv", "jsonl"] | None = None):
+    """
+    Imports historical leave requests from an uploaded CSV or JSON Lines file.
+    The upload is streamed in batches, so large files use constant memory.
+    """
+    file_format = format or ("jsonl" if (file.filename or "").endswith((".jsonl", ".ndjson")) else "csv")
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        return await db_tool_pool.run(import_leave_requests, stream, file_format)
+    except Exception:
+        logger.exception("Import failed")
+        raise HTTPException(status_code=500, detail="The import failed; rows from completed batches were kept.")
@@ -0,0 +1,157 @@
+import logging
+from datetime import date
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from db_config import ASYNC_DATABASE_URL, engine_options
+from digest import DIGEST_MODE
+from outbox import ENQUEUE_EMAIL_QUERY, decision_cc_notification, decision_notification, notification_cc
+from singleflight import coalesced
+from tracing import instrument_engine, traced
+from database import (
+    balance_cache,
+    BALANCE_QUERY,
+    BALANCE_AS_OF_QUERY,
+    LEDGER_WRITE_LOCK_QUERY,
+    CREATE_REQUEST_QUERY,
+    leave_request_params,
+    created_request_id,
+    DECIDE_REQUEST_QUERY,
+    decision_result,
+    LOCK_REQUESTS_QUERY,
+    BULK_DECIDE_QUERY,
+    bulk_decision_params,
+    bulk_decision_results,
+)
+
+logger = logging.getLogger(__name__)
+
+# --- ASYNC DATABASE CONNECTION SETUP ---
+# Same database and SQL as database.py, but driven by asyncpg so agent tools
+# and request handlers never block the event loop on database I/O. Unlike the
+# sync write functions, these raise on database errors instead of returning None,
+# so the REST endpoints can answer 503 rather than 404/422.
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(is_async=True))
+instrument_engine(async_engine)
+
+
+@traced("db")
+async def get_leave_balance(employee_email: str) -> float | None:
+    """
+    Retrieves the current leave balance for a given employee from Cloud SQL.
+    Repeated lookups are served from the in-process balance cache, and concurrent
+    cache misses for the same employee share one query.
+    """
+    cached = balance_cache.get(employee_email)
+    if cached is not None:
+        return cached
+    # Taken before the query: if the balance changes while it runs, set() drops the stale value.
+    # It is also part of the single-flight key, so lookups that start after an invalidation
+    # never join a query that started before it.
+    return await _load_leave_balance(employee_email, balance_cache.generation(employee_email))
+
+@coalesced
+async def _load_leave_balance(employee_email: str, generation: int) -> float | None:
+    """
+    Queries the balance and caches it unless the employee was invalidated since generation.
+    """
+    async with async_engine.connect() as connection:
+        result = (await connection.execute(BALANCE_QUERY, {"email": employee_email})).scalar_one_or_none()
+
+        if result is not None:
+            logger.info("Found leave balance for %s: %s", employee_email, result, extra={"sampled": True})
+            balance = float(result)
+            balance_cache.set(employee_email, balance, generation)
+            return balance
+        else:
+            logger.warning("No employee found with email: %s", employee_email)
+            return None
+
+@traced("db")
+async def get_leave_balance_as_of(employee_email: str, as_of: str) -> float | None:
+    """
+    Returns an employee's leave balance at the end of the given day (YYYY-MM-DD),
+    from the nearest ledger snapshot and the entries after it. Not cached.
+    Returns None if the employee does not exist or had no ledger entries by then.
+    """
+    async with async_engine.connect() as connection:
+        result = (await connection.execute(
+            BALANCE_AS_OF_QUERY, {"email": employee_email, "as_of": date.fromisoformat(as_of)}
+        )).scalar_one_or_none()
+    return float(result) if result is not None else None
+
+@traced("db")
+async def create_pending_leave_request(employee_email: str, start_date: str, end_date: str, reason: str) -> int | None:
+    """
+    Logs a new, pending leave request in Cloud SQL (PostgreSQL).
+    Requests with end_date before start_date, or for more days than the
+    employee's balance, are rejected in the same round trip.
+    Returns the unique ID (int) of the new leave request, or None if it was rejected.
+    Database errors are raised, so callers can tell an outage from a rejection.
+    """
+    logger.info("Creating pending leave request for %s from %s to %s", employee_email, start_date, end_date, extra={"sampled": True})
+    params = leave_request_params(employee_email, start_date, end_date, reason)
+    async with async_engine.begin() as connection:
+        created = (await connection.execute(CREATE_REQUEST_QUERY, params)).first()
+
+    return created_request_id(employee_email, params, created)
+
+@traced("db")
+async def update_leave_status(request_id: int, new_status: str) -> dict | None:
+    """
+    Updates a leave request to 'approved' or 'rejected' in Cloud SQL.
+    If approved, it deducts the leave from the employee's balance.
+    Returns a dict with employee_email and status, or None if the request does not exist.
+    Database errors are raised.
+    """
+    logger.info("Processing request %s with status '%s'", request_id, new_status, extra={"sampled": True})
+    subject, body = decision_notification(request_id, new_status)
+    cc_subject, cc_body = decision_cc_notification(request_id, new_status)
+    params = {
+        "req_id": request_id,
+        "status": new_status,
+        "subject": subject,
+        "body": body,
+        "cc_subject": cc_subject,
+        "cc_body": cc_body,
+        "cc": notification_cc(new_status),
+        "digest": DIGEST_MODE,
+    }
+    async with async_engine.begin() as connection:
+        if new_status == 'approved':
+            await connection.execute(LEDGER_WRITE_LOCK_QUERY)
+        decision = (await connection.execute(DECIDE_REQUEST_QUERY, params)).first()
+        if decision and not decision.changed and decision.status == 'pending':
+            # Lost a race with a concurrent decision; re-read its committed outcome.
+            decision = (await connection.execute(DECIDE_REQUEST_QUERY, params)).first()
+
+    return decision_result(request_id, new_status, decision)
+
+@traced("db")
+async def bulk_update_leave_status(request_ids: list[int], new_status: str) -> list[dict]:
+    """
+    Approves or rejects many leave requests in one transaction.
+    Returns one outcome dict per requested id (in the order given). Database errors are raised.
+    """
+    logger.info("Processing %s requests with status '%s'", len(request_ids), new_status)
+    params = bulk_decision_params(request_ids, new_status)
+    async with async_engine.begin() as connection:
+        if new_status == 'approved':
+            await connection.execute(LEDGER_WRITE_LOCK_QUERY)
+        await connection.execute(LOCK_REQUESTS_QUERY, {"ids": params["ids"]})
+        decisions = (await connection.execute(BULK_DECIDE_QUERY, params)).all()
+
+    return bulk_decision_results(request_ids, new_status, decisions)
+
+@traced("db")
+async def queue_email(recipient_email: str, subject: str, body: str) -> int:
+    """
+    Writes an email to the outbox for background delivery.
+    Returns the id of the outbox row.
+    """
+    async with async_engine.begin() as connection:
+        outbox_id = (await connection.execute(
+            ENQUEUE_EMAIL_QUERY, {"recipient": recipient_email, "subject": subject, "body": body}
+        )).scalar_one()
+    logger.info("Queued email %s to %s", outbox_id, recipient_email, extra={"sampled": True})
+    return outbox_id
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    A small thread-safe LRU cache whose entries expire after `ttl` seconds.
+    Keeps hit/miss/eviction counters so callers can report hit rates.
+
+    Every invalidation bumps the key's generation. A reader that loads a value
+    from the source of truth takes generation(key) first and passes it to set(),
+    which drops the value if the key was invalidated in the meantime.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_sets = 0
+        # Generations of recently invalidated keys, bounded like _data. Keys that
+        # fall out of it read as _generation_floor, which only ever rises, so a
+        # generation taken before an invalidation never matches again.
+        self._generations = OrderedDict()
+        self._generation_clock = 0
+        self._generation_floor = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def generation(self, key) -> int:
+        with self._lock:
+            return self._generations.get(key, self._generation_floor)
+
+    def set(self, key, value, generation: int | None = None) -> bool:
+        """
+        Stores value under key. If generation is given and the key has been
+        invalidated since it was taken, the value is stale and is not stored.
+        Returns whether the value was stored.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generations.get(key, self._generation_floor):
+                self.stale_sets += 1
+                return False
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._generation_clock += 1
+            self._generations[key] = self._generation_clock
+            self._generations.move_to_end(key)
+            while len(self._generations) > self.maxsize:
+                _, evicted = self._generations.popitem(last=False)
+                self._generation_floor = max(self._generation_floor, evicted)
+            if self._data.pop(key, _MISSING) is not _MISSING:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._generation_clock += 1
+            self._generation_floor = self._generation_clock
+            self._generations.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stale_sets": self.stale_sets,
+            }
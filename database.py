@@ -1,117 +1,463 @@
 # In database.py
+import logging
 import os
-from dotenv import load_dotenv
 from sqlalchemy import create_engine, text
 from datetime import date
 
-# Load environment variables from .env file
-load_dotenv()
+from cache import TTLCache
+from db_config import DATABASE_URL, engine_options
+from digest import DIGEST_MODE
+from outbox import ENQUEUE_EMAIL_QUERY, decision_cc_notification, decision_notification, notification_cc
+from singleflight import coalesced
+from tracing import instrument_engine, traced
+
+logger = logging.getLogger(__name__)
 
 # --- DATABASE CONNECTION SETUP ---
-DB_HOST = "127.0.0.1" # Connecting via Cloud SQL Proxy
-DB_PORT = "5432"
-DB_USER = "postgres"
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_NAME = "leave_app_db" # Ensure this matches the DB name in Cloud SQL
+# Connection settings and pool sizing are read from the environment in db_config.py.
+engine = create_engine(DATABASE_URL, **engine_options())
+instrument_engine(engine)
+
+# --- LEAVE BALANCE CACHE ---
+# Balances only change when a request is approved or a ledger entry is added, so reads are served from memory
+# and every balance-changing path invalidates the employee's entry after commit.
+BALANCE_CACHE_TTL = float(os.getenv("BALANCE_CACHE_TTL", "300"))
+BALANCE_CACHE_SIZE = int(os.getenv("BALANCE_CACHE_SIZE", "10000"))
+balance_cache = TTLCache(maxsize=BALANCE_CACHE_SIZE, ttl=BALANCE_CACHE_TTL)
 
-if not DB_PASSWORD:
-    raise ValueError("❌ DB_PASSWORD environment variable not found.")
+def balance_cache_stats() -> dict:
+    """
+    Returns hit/miss counters and the current size of the leave balance cache.
+    """
+    return balance_cache.stats()
+
+
+# --- SQL STATEMENTS ---
+# Shared with async_database.py so the sync and async paths run identical SQL.
+# Balances come from the leave ledger (see ledger.py): latest snapshot plus later entries.
+# The current balance counts entries effective up to today; post-dated accruals and
+# adjustments only count once their effective date arrives.
+BALANCE_QUERY = text(
+    "SELECT leave_balance_as_of(id, CURRENT_DATE) FROM employees WHERE email = :email"
+)
+BALANCE_AS_OF_QUERY = text(
+    "SELECT leave_balance_as_of(id, CAST(:as_of AS DATE)) FROM employees WHERE email = :email"
+)
+# Ledger writers (approvals, hand-added entries) hold this lock shared and
+# ledger.snapshot_balances holds it exclusively, so a snapshot never runs while an
+# entry it should include is still uncommitted.
+LEDGER_WRITE_LOCK_QUERY = text("SELECT pg_advisory_xact_lock_shared(hashtext('leave_ledger_snapshot'))")
+# Creates a pending request in one round trip. The INSERT ... SELECT only produces a
+# row when the employee exists, end_date >= start_date and the balance covers the
+# requested days; the outer SELECT says which check failed otherwise.
+# In digest mode the employee's manager also gets a notification event.
+CREATE_REQUEST_QUERY = text(
+    """
+    WITH employee AS (
+        SELECT id, leave_balance_as_of(id, CURRENT_DATE) AS leave_balance, manager_email
+        FROM employees WHERE email = :email
+    ),
+    created AS (
+        INSERT INTO leave_requests (employee_id, start_date, end_date, reason, status)
+        SELECT employee.id, CAST(:start_date AS DATE), CAST(:end_date AS DATE), :reason, 'pending'
+        FROM employee
+        WHERE CAST(:end_date AS DATE) >= CAST(:start_date AS DATE)
+          AND employee.leave_balance >= (CAST(:end_date AS DATE) - CAST(:start_date AS DATE)) + 1
+        RETURNING id
+    ),
+    notified AS (
+        INSERT INTO notification_events (recipient, kind, request_id, employee_email, start_date, end_date, reason)
+        SELECT employee.manager_email, 'pending', created.id, :email, CAST(:start_date AS DATE), CAST(:end_date AS DATE), :reason
+        FROM created CROSS JOIN employee
+        WHERE CAST(:digest AS BOOLEAN) AND employee.manager_email IS NOT NULL
+        RETURNING id
+    )
+    SELECT (SELECT id FROM created) AS request_id,
+           EXISTS (SELECT 1 FROM employee) AS employee_found,
+           (SELECT leave_balance FROM employee) AS leave_balance
+    """
+)
+# Decides a pending request in one round trip: status change, duration, a ledger
+# deduction on approval, notification email and the employee's email for the reply.
+# Notifications go to the employee, plus the manager and :cc on approval, who get
+# a copy that names the employee; in digest mode they are recorded as notification
+# events instead of emails.
+# The UPDATE only matches while the request is still pending, so the row lock is
+# held for a single statement and a request can never be decided twice. The
+# deduction is an INSERT, so approvals never contend for the employee row.
+# Approvals run after LEDGER_WRITE_LOCK_QUERY. A transaction that started before
+# midnight can still find yesterday's snapshot already taken (the snapshot waited
+# for the lock, this transaction took it after), so the deduction is also applied
+# to any snapshot on or after its effective date.
+DECIDE_REQUEST_QUERY = text(
+    """
+    WITH request AS (
+        SELECT employee_id, status FROM leave_requests WHERE id = :req_id
+    ),
+    decided AS (
+        UPDATE leave_requests
+        SET status = CAST(:status AS TEXT)
+        WHERE id = :req_id AND status = 'pending'
+        RETURNING id, employee_id, start_date, end_date, reason, (end_date - start_date) + 1 AS duration
+    ),
+    recipients AS (
+        SELECT decided.id AS request_id, employees.email AS employee_email, recipient, position = 1 AS is_employee
+        FROM decided
+        JOIN employees ON employees.id = decided.employee_id
+        CROSS JOIN LATERAL unnest(
+            array_remove(ARRAY[employees.email, CASE WHEN CAST(:status AS TEXT) = 'approved' THEN employees.manager_email END], NULL)
+            || CAST(:cc AS TEXT[])
+        ) WITH ORDINALITY AS addressees (recipient, position)
+    ),
+    deducted AS (
+        INSERT INTO leave_ledger (employee_id, entry_type, days, request_id, note)
+        SELECT employee_id, 'deduction', -duration, id, 'Approved leave request'
+        FROM decided
+        WHERE CAST(:status AS TEXT) = 'approved'
+        RETURNING id
+    ),
+    resnapshotted AS (
+        UPDATE leave_balance_snapshots
+        SET balance = leave_balance_snapshots.balance - approved.days
+        FROM (
+            SELECT employee_id, SUM(duration) AS days FROM decided
+            WHERE CAST(:status AS TEXT) = 'approved'
+            GROUP BY employee_id
+        ) AS approved
+        WHERE leave_balance_snapshots.employee_id = approved.employee_id
+          AND leave_balance_snapshots.as_of >= CURRENT_DATE
+    ),
+    notified AS (
+        INSERT INTO email_outbox (recipient, subject, body)
+        SELECT recipients.recipient,
+               CASE WHEN recipients.is_employee THEN :subject
+                    ELSE replace(:cc_subject, '{employee_email}', recipients.employee_email) END,
+               CASE WHEN recipients.is_employee THEN :body
+                    ELSE replace(:cc_body, '{employee_email}', recipients.employee_email) END
+        FROM recipients
+        WHERE NOT CAST(:digest AS BOOLEAN)
+        RETURNING id
+    ),
+    digested AS (
+        INSERT INTO notification_events (recipient, kind, request_id, employee_email, start_date, end_date, reason)
+        SELECT recipients.recipient, CAST(:status AS TEXT), decided.id, recipients.employee_email,
+               decided.start_date, decided.end_date, decided.reason
+        FROM recipients JOIN decided ON decided.id = recipients.request_id
+        WHERE CAST(:digest AS BOOLEAN)
+        RETURNING id
+    )
+    SELECT employees.email AS employee_email,
+           EXISTS (SELECT 1 FROM decided) AS changed,
+           CASE WHEN EXISTS (SELECT 1 FROM decided) THEN CAST(:status AS TEXT) ELSE request.status END AS status,
+           (SELECT duration FROM decided) AS duration
+    FROM request JOIN employees ON employees.id = request.employee_id
+    """
+)
 
-DATABASE_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(DATABASE_URL)
 
+# --- Bulk decisions ---
+# Requests are locked in id order, so concurrent bulk calls always take locks in
+# the same order and cannot deadlock each other.
+LOCK_REQUESTS_QUERY = text(
+    "SELECT id, employee_id FROM leave_requests WHERE id = ANY(CAST(:ids AS BIGINT[])) ORDER BY id FOR UPDATE"
+)
+# Set-based decision: one UPDATE for all statuses, one INSERT for all ledger
+# deductions, one INSERT for all notifications. Snapshots are handled as in
+# DECIDE_REQUEST_QUERY.
+BULK_DECIDE_QUERY = text(
+    """
+    WITH decided AS (
+        UPDATE leave_requests
+        SET status = CAST(:status AS TEXT)
+        WHERE id = ANY(CAST(:ids AS BIGINT[])) AND status = 'pending'
+        RETURNING id, employee_id, start_date, end_date, reason, (end_date - start_date) + 1 AS duration
+    ),
+    recipients AS (
+        SELECT decided.id AS request_id, employees.email AS employee_email, recipient, position = 1 AS is_employee
+        FROM decided
+        JOIN employees ON employees.id = decided.employee_id
+        CROSS JOIN LATERAL unnest(
+            array_remove(ARRAY[employees.email, CASE WHEN CAST(:status AS TEXT) = 'approved' THEN employees.manager_email END], NULL)
+            || CAST(:cc AS TEXT[])
+        ) WITH ORDINALITY AS addressees (recipient, position)
+    ),
+    deducted AS (
+        INSERT INTO leave_ledger (employee_id, entry_type, days, request_id, note)
+        SELECT employee_id, 'deduction', -duration, id, 'Approved leave request'
+        FROM decided
+        WHERE CAST(:status AS TEXT) = 'approved'
+        RETURNING id
+    ),
+    resnapshotted AS (
+        UPDATE leave_balance_snapshots
+        SET balance = leave_balance_snapshots.balance - approved.days
+        FROM (
+            SELECT employee_id, SUM(duration) AS days FROM decided
+            WHERE CAST(:status AS TEXT) = 'approved'
+            GROUP BY employee_id
+        ) AS approved
+        WHERE leave_balance_snapshots.employee_id = approved.employee_id
+          AND leave_balance_snapshots.as_of >= CURRENT_DATE
+    ),
+    notified AS (
+        INSERT INTO email_outbox (recipient, subject, body)
+        SELECT recipients.recipient,
+               CASE WHEN recipients.is_employee THEN notes.subject
+                    ELSE replace(notes.cc_subject, '{employee_email}', recipients.employee_email) END,
+               CASE WHEN recipients.is_employee THEN notes.body
+                    ELSE replace(notes.cc_body, '{employee_email}', recipients.employee_email) END
+        FROM recipients
+        JOIN unnest(
+            CAST(:ids AS BIGINT[]), CAST(:subjects AS TEXT[]), CAST(:bodies AS TEXT[]),
+            CAST(:cc_subjects AS TEXT[]), CAST(:cc_bodies AS TEXT[])
+        ) AS notes (request_id, subject, body, cc_subject, cc_body) ON notes.request_id = recipients.request_id
+        WHERE NOT CAST(:digest AS BOOLEAN)
+        RETURNING id
+    ),
+    digested AS (
+        INSERT INTO notification_events (recipient, kind, request_id, employee_email, start_date, end_date, reason)
+        SELECT recipients.recipient, CAST(:status AS TEXT), decided.id, recipients.employee_email,
+               decided.start_date, decided.end_date, decided.reason
+        FROM recipients JOIN decided ON decided.id = recipients.request_id
+        WHERE CAST(:digest AS BOOLEAN)
+        RETURNING id
+    )
+    SELECT leave_requests.id AS request_id,
+           employees.email AS employee_email,
+           decided.id IS NOT NULL AS changed,
+           CASE WHEN decided.id IS NULL THEN leave_requests.status ELSE CAST(:status AS TEXT) END AS status,
+           decided.duration
+    FROM leave_requests
+    JOIN employees ON employees.id = leave_requests.employee_id
+    LEFT JOIN decided ON decided.id = leave_requests.id
+    WHERE leave_requests.id = ANY(CAST(:ids AS BIGINT[]))
+    """
+)
 
+@traced("db")
 def get_leave_balance(employee_email: str) -> float | None:
     """
     Retrieves the current leave balance for a given employee from Cloud SQL.
+    Repeated lookups are served from the in-process balance cache, and concurrent
+    cache misses for the same employee share one query.
+    """
+    cached = balance_cache.get(employee_email)
+    if cached is not None:
+        return cached
+    # Taken before the query: if the balance changes while it runs, set() drops the stale value.
+    # It is also part of the single-flight key, so lookups that start after an invalidation
+    # never join a query that started before it.
+    return _load_leave_balance(employee_email, balance_cache.generation(employee_email))
+
+@coalesced
+def _load_leave_balance(employee_email: str, generation: int) -> float | None:
+    """
+    Queries the balance and caches it unless the employee was invalidated since generation.
     """
     with engine.connect() as connection:
-        query = text("SELECT leave_balance FROM employees WHERE email = :email")
-        result = connection.execute(query, {"email": employee_email}).scalar_one_or_none()
+        result = connection.execute(BALANCE_QUERY, {"email": employee_email}).scalar_one_or_none()
 
         if result is not None:
-            print(f"✅ DB: Found leave balance for {employee_email}: {result}")
-            return float(result)
+            logger.info("Found leave balance for %s: %s", employee_email, result, extra={"sampled": True})
+            balance = float(result)
+            balance_cache.set(employee_email, balance, generation)
+            return balance
         else:
-            print(f"⚠️ DB: No employee found with email: {employee_email}")
+            logger.warning("No employee found with email: %s", employee_email)
             return None
 
+@traced("db")
+def get_leave_balance_as_of(employee_email: str, as_of: str) -> float | None:
+    """
+    Returns an employee's leave balance at the end of the given day (YYYY-MM-DD),
+    from the nearest ledger snapshot and the entries after it. Not cached.
+    Returns None if the employee does not exist or had no ledger entries by then.
+    """
+    with engine.connect() as connection:
+        result = connection.execute(
+            BALANCE_AS_OF_QUERY, {"email": employee_email, "as_of": date.fromisoformat(as_of)}
+        ).scalar_one_or_none()
+    return float(result) if result is not None else None
+
+@traced("db")
 def create_pending_leave_request(employee_email: str, start_date: str, end_date: str, reason: str) -> int | None:
     """
     Logs a new, pending leave request in Cloud SQL (PostgreSQL).
+    Requests with end_date before start_date, or for more days than the
+    employee's balance, are rejected in the same round trip.
     Returns the unique ID (int) of the new leave request, or None if failed.
     """
-    print(f"✅ DB: Creating pending leave request for {employee_email} from {start_date} to {end_date}...")
-    with engine.connect() as connection:
-        try:
-            find_id_query = text("SELECT id FROM employees WHERE email = :email")
-            employee_id = connection.execute(find_id_query, {"email": employee_email}).scalar_one_or_none()
-
-            if not employee_id:
-                print(f"⚠️ DB: Cannot create request. No employee found: {employee_email}")
-                return None
-
-            insert_query = text(
-                """
-                INSERT INTO leave_requests (employee_id, start_date, end_date, reason, status)
-                VALUES (:emp_id, :start_date, :end_date, :reason, 'pending')
-                RETURNING id
-                """
-            )
-            result = connection.execute(
-                insert_query,
-                {"emp_id": employee_id, "start_date": date.fromisoformat(start_date), "end_date": date.fromisoformat(end_date), "reason": reason}
-            )
-            new_request_id = result.scalar_one()
-            connection.commit()
-
-            print(f"✅ DB: Successfully created pending request with ID: {new_request_id}")
-            return new_request_id
-        except Exception as e:
-            print(f"❌ DB: Error creating leave request: {e}")
-            connection.rollback()
-            return None
+    logger.info("Creating pending leave request for %s from %s to %s", employee_email, start_date, end_date, extra={"sampled": True})
+    try:
+        params = leave_request_params(employee_email, start_date, end_date, reason)
+        with engine.begin() as connection:
+            created = connection.execute(CREATE_REQUEST_QUERY, params).first()
+    except Exception:
+        logger.exception("Error creating leave request")
+        return None
+
+    return created_request_id(employee_email, params, created)
+
+def leave_request_params(employee_email: str, start_date: str, end_date: str, reason: str) -> dict:
+    """
+    Builds the parameters for CREATE_REQUEST_QUERY. Raises ValueError for malformed dates.
+    """
+    return {
+        "email": employee_email,
+        "start_date": date.fromisoformat(start_date),
+        "end_date": date.fromisoformat(end_date),
+        "reason": reason,
+        "digest": DIGEST_MODE,
+    }
+
+def created_request_id(employee_email: str, params: dict, created) -> int | None:
+    """
+    Turns the row returned by CREATE_REQUEST_QUERY into the new request id,
+    logging why the request was rejected if it was not created.
+    """
+    if created.request_id is not None:
+        logger.info("Created pending request %s", created.request_id, extra={"sampled": True})
+        return created.request_id
+
+    requested_days = (params["end_date"] - params["start_date"]).days + 1
+    if not created.employee_found:
+        logger.warning("Cannot create request. No employee found: %s", employee_email)
+    elif requested_days < 1:
+        logger.warning("Cannot create request. End date %s is before start date %s.", params["end_date"], params["start_date"])
+    else:
+        logger.warning("Cannot create request. %s days requested but balance is %s.", requested_days, created.leave_balance)
+    return None
 
+@traced("db")
 def update_leave_status(request_id: int, new_status: str) -> dict | None:
     """
     Updates a leave request to 'approved' or 'rejected' in Cloud SQL.
     If approved, it deducts the leave from the employee's balance.
     Returns a dict with employee_email and status, or None if failed.
     """
-    print(f"✅ DB: Processing request ID {request_id} with status '{new_status}'...")
-    with engine.connect() as connection:
-        with connection.begin(): # Start transaction
-            try:
-                request_query = text("SELECT employee_id, start_date, end_date, status FROM leave_requests WHERE id = :req_id FOR UPDATE")
-                request_data = connection.execute(request_query, {"req_id": request_id}).first()
-
-                if not request_data:
-                    print(f"⚠️ DB: No request found with ID: {request_id}")
-                    return None
-
-                if request_data.status != 'pending':
-                    print(f"⚠️ DB: Request {request_id} already processed. Status: {request_data.status}")
-                    email_query = text("SELECT email FROM employees WHERE id = :emp_id")
-                    employee_email = connection.execute(email_query, {"emp_id": request_data.employee_id}).scalar()
-                    return {"employee_email": employee_email, "status": request_data.status}
-
-                update_query = text("UPDATE leave_requests SET status = :status WHERE id = :req_id")
-                connection.execute(update_query, {"status": new_status, "req_id": request_id})
-                employee_id = request_data.employee_id
-
-                if new_status == 'approved':
-                    duration_query = text("SELECT (:end_date::date - :start_date::date) + 1 AS duration")
-                    duration = connection.execute(duration_query, {"start_date": request_data.start_date, "end_date": request_data.end_date}).scalar()
-                    deduct_query = text("UPDATE employees SET leave_balance = leave_balance - :duration WHERE id = :emp_id")
-                    connection.execute(deduct_query, {"duration": duration, "emp_id": employee_id})
-                    print(f"✅ DB: Deducted {duration} days from employee {employee_id}")
-
-                email_query = text("SELECT email FROM employees WHERE id = :emp_id")
-                employee_email = connection.execute(email_query, {"emp_id": employee_id}).scalar()
-
-                print(f"✅ DB: Successfully processed request {request_id}.")
-                return {"employee_email": employee_email, "status": new_status}
-
-            except Exception as e:
-                print(f"❌ DB: Error updating leave status: {e}")
-                return None
\ No newline at end of file
+    logger.info("Processing request %s with status '%s'", request_id, new_status, extra={"sampled": True})
+    subject, body = decision_notification(request_id, new_status)
+    cc_subject, cc_body = decision_cc_notification(request_id, new_status)
+    params = {
+        "req_id": request_id,
+        "status": new_status,
+        "subject": subject,
+        "body": body,
+        "cc_subject": cc_subject,
+        "cc_body": cc_body,
+        "cc": notification_cc(new_status),
+        "digest": DIGEST_MODE,
+    }
+    try:
+        with engine.begin() as connection:
+            if new_status == 'approved':
+                connection.execute(LEDGER_WRITE_LOCK_QUERY)
+            decision = connection.execute(DECIDE_REQUEST_QUERY, params).first()
+            if decision and not decision.changed and decision.status == 'pending':
+                # Lost a race with a concurrent decision; re-read its committed outcome.
+                decision = connection.execute(DECIDE_REQUEST_QUERY, params).first()
+    except Exception:
+        logger.exception("Error updating leave status")
+        return None
+
+    return decision_result(request_id, new_status, decision)
+
+def decision_result(request_id: int, new_status: str, decision) -> dict | None:
+    """
+    Turns the row returned by DECIDE_REQUEST_QUERY into update_leave_status's return value.
+    """
+    if not decision:
+        logger.warning("No request found with ID: %s", request_id)
+        return None
+
+    if not decision.changed:
+        logger.warning("Request %s already processed. Status: %s", request_id, decision.status)
+        return {"employee_email": decision.employee_email, "status": decision.status}
+
+    if new_status == 'approved':
+        logger.info("Deducted %s days from %s", decision.duration, decision.employee_email, extra={"sampled": True})
+        # Invalidated after commit; a read that started before it will not re-cache the old balance
+        # because invalidate() bumps the key's generation.
+        balance_cache.invalidate(decision.employee_email)
+
+    logger.info("Processed request %s", request_id, extra={"sampled": True})
+    return {"employee_email": decision.employee_email, "status": new_status}
+
+
+@traced("db")
+def bulk_update_leave_status(request_ids: list[int], new_status: str) -> list[dict] | None:
+    """
+    Approves or rejects many leave requests in one transaction.
+    Returns one outcome dict per requested id (in the order given), or None if failed.
+    """
+    logger.info("Processing %s requests with status '%s'", len(request_ids), new_status)
+    params = bulk_decision_params(request_ids, new_status)
+    try:
+        with engine.begin() as connection:
+            if new_status == 'approved':
+                connection.execute(LEDGER_WRITE_LOCK_QUERY)
+            connection.execute(LOCK_REQUESTS_QUERY, {"ids": params["ids"]})
+            decisions = connection.execute(BULK_DECIDE_QUERY, params).all()
+    except Exception:
+        logger.exception("Error bulk updating leave status")
+        return None
+
+    return bulk_decision_results(request_ids, new_status, decisions)
+
+def bulk_decision_params(request_ids: list[int], new_status: str) -> dict:
+    """
+    Builds the parameters for BULK_DECIDE_QUERY, including one notification per request.
+    """
+    ids = sorted(set(request_ids))
+    notifications = [decision_notification(request_id, new_status) for request_id in ids]
+    copies = [decision_cc_notification(request_id, new_status) for request_id in ids]
+    return {
+        "ids": ids,
+        "status": new_status,
+        "subjects": [subject for subject, _ in notifications],
+        "bodies": [body for _, body in notifications],
+        "cc_subjects": [subject for subject, _ in copies],
+        "cc_bodies": [body for _, body in copies],
+        "cc": notification_cc(new_status),
+        "digest": DIGEST_MODE,
+    }
+
+def bulk_decision_results(request_ids: list[int], new_status: str, decisions) -> list[dict]:
+    """
+    Turns the rows returned by BULK_DECIDE_QUERY into per-request outcomes.
+    """
+    by_id = {row.request_id: row for row in decisions}
+    results = []
+    for request_id in request_ids:
+        row = by_id.get(request_id)
+        if row is None:
+            results.append({"request_id": request_id, "employee_email": None, "status": None, "changed": False})
+            continue
+        results.append({
+            "request_id": request_id,
+            "employee_email": row.employee_email,
+            "status": row.status,
+            "changed": row.changed,
+        })
+
+    changed = [row for row in decisions if row.changed]
+    if new_status == 'approved':
+        for employee_email in {row.employee_email for row in changed}:
+            balance_cache.invalidate(employee_email)
+
+    logger.info("Bulk processed %s of %s requests", len(changed), len(request_ids))
+    return results
+
+
+@traced("db")
+def queue_email(recipient_email: str, subject: str, body: str) -> int:
+    """
+    Writes an email to the outbox for background delivery.
+    Returns the id of the outbox row.
+    """
+    with engine.begin() as connection:
+        outbox_id = connection.execute(
+            ENQUEUE_EMAIL_QUERY, {"recipient": recipient_email, "subject": subject, "body": body}
+        ).scalar_one()
+    logger.info("Queued email %s to %s", outbox_id, recipient_email, extra={"sampled": True})
+    return outbox_id
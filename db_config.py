@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Load environment variables from .env file
+load_dotenv()
+
+# --- DATABASE CONNECTION SETUP ---
+DB_HOST = os.getenv("DB_HOST", "127.0.0.1") # Connecting via Cloud SQL Proxy
+DB_PORT = os.getenv("DB_PORT", "5432")
+DB_USER = os.getenv("DB_USER", "postgres")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_NAME = os.getenv("DB_NAME", "leave_app_db") # Ensure this matches the DB name in Cloud SQL
+
+if not DB_PASSWORD:
+    raise ValueError("❌ DB_PASSWORD environment variable not found.")
+
+DATABASE_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# --- CONNECTION POOL SETTINGS ---
+# Every uvicorn worker holds (pool_size + max_overflow) connections per engine at most,
+# so size these against the Cloud SQL proxy's connection limit.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "10000"))
+DB_LOCK_TIMEOUT_MS = int(os.getenv("DB_LOCK_TIMEOUT_MS", "5000"))
+
+
+class PoolTelemetry:
+    """
+    Counts connection checkouts, time spent waiting for a connection and
+    how often new connections are opened.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+        self._recent_creates = deque()
+        self.connections_created = 0
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.checkout_errors = 0
+
+    def record_checkout(self, wait: float, failed: bool = False) -> None:
+        with self._lock:
+            if failed:
+                self.checkout_errors += 1
+                return
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def record_create(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.connections_created += 1
+            self._recent_creates.append(now)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            while self._recent_creates and now - self._recent_creates[0] > 60:
+                self._recent_creates.popleft()
+            uptime = now - self._started_at
+            return {
+                "checkouts": self.checkouts,
+                "checkout_errors": self.checkout_errors,
+                "avg_wait_seconds": self.total_wait / self.checkouts if self.checkouts else 0.0,
+                "max_wait_seconds": self.max_wait,
+                "connections_created": self.connections_created,
+                "connections_created_per_minute": len(self._recent_creates),
+                "connections_created_per_second_lifetime": self.connections_created / uptime if uptime else 0.0,
+            }
+
+
+class _InstrumentedPoolMixin:
+    # Kept on the class, because SQLAlchemy rebuilds pools via their class on dispose().
+    telemetry = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.telemetry.record_checkout(time.perf_counter() - started, failed=True)
+            raise
+        self.telemetry.record_checkout(time.perf_counter() - started)
+        return connection
+
+    def _create_connection(self):
+        self.telemetry.record_create()
+        return super()._create_connection()
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    telemetry = PoolTelemetry()
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    telemetry = PoolTelemetry()
+
+
+def engine_options(is_async: bool = False) -> dict:
+    """
+    Returns the keyword arguments for create_engine / create_async_engine,
+    including per-connection statement and lock timeouts.
+    """
+    if is_async:
+        connect_args = {"server_settings": {
+            "statement_timeout": str(DB_STATEMENT_TIMEOUT_MS),
+            "lock_timeout": str(DB_LOCK_TIMEOUT_MS),
+        }}
+    else:
+        connect_args = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS} -c lock_timeout={DB_LOCK_TIMEOUT_MS}"}
+
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+
+def pool_stats(engine) -> dict:
+    """
+    Returns live statistics for an engine's connection pool.
+    Accepts both sync engines and AsyncEngine.
+    """
+    pool = getattr(engine, "sync_engine", engine).pool
+    stats = {
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "max_overflow": DB_MAX_OVERFLOW,
+    }
+    stats.update(pool.telemetry.stats())
+    return stats
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import os
+from itertools import groupby
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# --- NOTIFICATION DIGESTS ---
+# With NOTIFICATION_MODE=digest, new pending requests (for the employee's manager)
+# and decisions (for the employee, their manager and HR) are written to
+# notification_events instead of email_outbox. Every DIGEST_WINDOW seconds the
+# DigestWorker turns each recipient's events into one summary email and queues
+# all of them in the outbox with a single INSERT, in the same transaction that
+# consumes the events.
+
+NOTIFICATION_MODE = os.getenv("NOTIFICATION_MODE", "immediate")
+if NOTIFICATION_MODE not in ("immediate", "digest"):
+    raise ValueError(f"Unknown NOTIFICATION_MODE: {NOTIFICATION_MODE}")
+DIGEST_MODE = NOTIFICATION_MODE == "digest"
+
+DIGEST_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS notification_events (
+        id BIGSERIAL PRIMARY KEY,
+        recipient TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        request_id BIGINT NOT NULL,
+        employee_email TEXT NOT NULL,
+        start_date DATE NOT NULL,
+        end_date DATE NOT NULL,
+        reason TEXT,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+]
+
+# Only one process flushes at a time, so a recipient's events never end up split
+# across two digests sent by different workers.
+DIGEST_LOCK_QUERY = text("SELECT pg_try_advisory_xact_lock(hashtext('leave_notification_digest'))")
+CLAIM_EVENTS_QUERY = text(
+    """
+    DELETE FROM notification_events
+    WHERE id IN (SELECT id FROM notification_events ORDER BY id LIMIT :limit)
+    RETURNING recipient, kind, request_id, employee_email, start_date, end_date, reason
+    """
+)
+ENQUEUE_DIGESTS_QUERY = text(
+    """
+    INSERT INTO email_outbox (recipient, subject, body)
+    SELECT * FROM unnest(CAST(:recipients AS TEXT[]), CAST(:subjects AS TEXT[]), CAST(:bodies AS TEXT[]))
+    """
+)
+
+
+def render_digest(recipient: str, events: list) -> tuple[str, str]:
+    """
+    Returns the (subject, body) of one recipient's digest email.
+    """
+    pending = [event for event in events if event.kind == "pending"]
+    decided = [event for event in events if event.kind != "pending"]
+
+    subject = f"Leave digest: {len(pending)} pending, {len(decided)} decided"
+    sections = []
+    if pending:
+        lines = "\n".join(
+            f"    - #{event.request_id} {event.employee_email}, {event.start_date} to {event.end_date}: {event.reason}"
+            for event in pending
+        )
+        sections.append(f"    Leave requests awaiting your decision:\n{lines}")
+    if decided:
+        lines = "\n".join(
+            f"    - #{event.request_id} {event.employee_email}, {event.start_date} to {event.end_date}: {event.kind}"
+            for event in decided
+        )
+        sections.append(f"    Leave requests that have been decided:\n{lines}")
+    details = "\n\n".join(sections)
+
+    body = f"""
+    Hello {recipient},
+
+    Here is your summary of leave activity since the last digest.
+
+{details}
+
+    Best regards,
+    Leave Management System
+    """
+    return subject, body
+
+
+class DigestWorker:
+    """
+    Flushes notification_events into one digest email per recipient every window.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.window = float(os.getenv("DIGEST_WINDOW", "900"))
+        self.batch_size = int(os.getenv("DIGEST_BATCH_SIZE", "5000"))
+        self._stop = asyncio.Event()
+        self._task = None
+        self.events_digested = 0
+        self.digests_queued = 0
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task:
+            await self._task
+
+    async def run(self) -> None:
+        logger.info("Digest worker started with a %s second window", self.window)
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=self.window)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                # Keep flushing until the backlog is smaller than one batch.
+                while await self.flush_once() >= self.batch_size:
+                    pass
+            except Exception:
+                logger.exception("Error flushing notification digests")
+        logger.info("Digest worker stopped")
+
+    async def flush_once(self) -> int:
+        """
+        Consumes up to batch_size events and queues their digests. Returns the number of events consumed.
+        """
+        async with self.engine.begin() as connection:
+            if not (await connection.execute(DIGEST_LOCK_QUERY)).scalar():
+                return 0
+            events = (await connection.execute(CLAIM_EVENTS_QUERY, {"limit": self.batch_size})).all()
+            if not events:
+                return 0
+
+            recipients, subjects, bodies = [], [], []
+            ordered = sorted(events, key=lambda event: (event.recipient, event.kind != "pending", event.request_id))
+            for recipient, recipient_events in groupby(ordered, key=lambda event: event.recipient):
+                subject, body = render_digest(recipient, list(recipient_events))
+                recipients.append(recipient)
+                subjects.append(subject)
+                bodies.append(body)
+            await connection.execute(
+                ENQUEUE_DIGESTS_QUERY, {"recipients": recipients, "subjects": subjects, "bodies": bodies}
+            )
+
+        self.events_digested += len(events)
+        self.digests_queued += len(recipients)
+        logger.info("Queued %s digests for %s notification events", len(recipients), len(events))
+        return len(events)
+
+    def stats(self) -> dict:
+        return {
+            "window_seconds": self.window,
+            "events_digested": self.events_digested,
+            "digests_queued": self.digests_queued,
+            "emails_saved": self.events_digested - self.digests_queued,
+        }
@@ -0,0 +1,129 @@
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+
+# --- SENDGRID CLIENT ---
+# One long-lived async client per process: connections to SendGrid are kept
+# alive and reused, sends run concurrently up to EMAIL_SEND_CONCURRENCY, and
+# each send is bounded by EMAIL_SEND_TIMEOUT. SENDGRID_API_HOST lets load tests
+# point it at a local SendGrid stand-in (see loadtest/stub_sendgrid.py).
+
+SENDGRID_API_HOST = os.getenv("SENDGRID_API_HOST", "https://api.sendgrid.com")
+EMAIL_SEND_CONCURRENCY = int(os.getenv("EMAIL_SEND_CONCURRENCY", "10"))
+EMAIL_SEND_TIMEOUT = float(os.getenv("EMAIL_SEND_TIMEOUT", "10"))
+EMAIL_KEEPALIVE_CONNECTIONS = int(os.getenv("EMAIL_KEEPALIVE_CONNECTIONS", "10"))
+
+
+class EmailSendError(RuntimeError):
+    """
+    Raised when SendGrid does not accept an email.
+    """
+
+
+class AsyncSendGridClient:
+    """
+    Sends plain-text emails through the SendGrid v3 API over a pooled httpx client.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        sender: str,
+        base_url: str = SENDGRID_API_HOST,
+        max_concurrency: int = EMAIL_SEND_CONCURRENCY,
+        timeout: float = EMAIL_SEND_TIMEOUT,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        # transport replaces the network, e.g. with httpx.MockTransport in tests.
+        self.sender = sender
+        self.timeout = timeout
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            transport=transport,
+            headers={"Authorization": f"Bearer {api_key}"},
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=min(EMAIL_KEEPALIVE_CONNECTIONS, max_concurrency),
+            ),
+            timeout=timeout,
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.total_seconds = 0.0
+
+    async def send(self, recipient_email: str, subject: str, body: str) -> None:
+        """
+        Sends one email. Raises EmailSendError (or an httpx error) if it was not accepted.
+        """
+        payload = {
+            "personalizations": [{"to": [{"email": recipient_email}]}],
+            "from": {"email": self.sender},
+            "subject": subject,
+            "content": [{"type": "text/plain", "value": body}],
+        }
+        async with self._semaphore:
+            started = time.perf_counter()
+            with self._lock:
+                self.in_flight += 1
+            try:
+                # wait_for bounds the whole send, including time spent waiting for a pooled connection.
+                response = await asyncio.wait_for(self._client.post("/v3/mail/send", json=payload), self.timeout)
+                if response.status_code != 202:  # 202 is the status code for "accepted"
+                    raise EmailSendError(f"Failed to send email. Status code: {response.status_code}")
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+                raise
+            else:
+                with self._lock:
+                    self.sent += 1
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                    self.total_seconds += time.perf_counter() - started
+
+    def stats(self) -> dict:
+        with self._lock:
+            attempts = self.sent + self.failed
+            return {
+                "sent": self.sent,
+                "failed": self.failed,
+                "in_flight": self.in_flight,
+                "avg_send_seconds": self.total_seconds / attempts if attempts else 0.0,
+            }
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_email_client = None
+
+
+def get_email_client() -> AsyncSendGridClient:
+    """
+    Returns the process-wide client, creating it on first use.
+    """
+    global _email_client
+    if _email_client is None:
+        sendgrid_api_key = os.getenv("SENDGRID_API_KEY")
+        if not sendgrid_api_key:
+            raise RuntimeError("SendGrid API key is not configured.")
+        _email_client = AsyncSendGridClient(sendgrid_api_key, os.getenv("SENDER_EMAIL"))
+    return _email_client
+
+
+def email_client_stats() -> dict:
+    return _email_client.stats() if _email_client else {"sent": 0, "failed": 0, "in_flight": 0, "avg_send_seconds": 0.0}
+
+
+async def close_email_client() -> None:
+    global _email_client
+    if _email_client is not None:
+        await _email_client.aclose()
+        _email_client = None
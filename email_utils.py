@@ -1,8 +1,12 @@
-import os
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+import logging
 
-SENDER_EMAIL = os.getenv("SENDER_EMAIL")
+from database import queue_email
+from email_client import get_email_client
+from tracing import traced
+
+logger = logging.getLogger(__name__)
+
+@traced("email")
 def draft_leave_email(employee_email: str, start_date:str, end_date:str, reason:str)->str:
     """
     Drafts a professional leave request email based on provided details.
@@ -35,7 +39,7 @@ def draft_leave_email(employee_email: str, start_date:str, end_date:str, reason:
     
     email_draft = f"Subject: {subject}\n\n{body}"
     
-    print("✅ Email drafted successfully.")
+    logger.info("Email drafted for %s", employee_email, extra={"sampled": True})
     return email_draft
 
 
@@ -43,9 +47,11 @@ def draft_leave_email(employee_email: str, start_date:str, end_date:str, reason:
 
 
 
-def send_email(recipient_email: str, subject: str, body: str) -> None:
+@traced("email")
+def send_email(recipient_email: str, subject: str, body: str) -> str:
     """
-    Sends an email using SendGrid.
+    Sends an email by queueing it in the email outbox.
+    A background worker delivers it through SendGrid, with retries.
 
     Args:
         recipient_email: The email address of the recipient.
@@ -55,26 +61,19 @@ def send_email(recipient_email: str, subject: str, body: str) -> None:
     Returns:
         A string indicating the status of the email sending operation.
     """
-    sendgrid_api_key= os.getenv("SENDGRID_API_KEY")
-    if not sendgrid_api_key:
-        return "Error: SendGrid API key is not configured."
-    
-    
-    message = Mail(
-        from_email=SENDER_EMAIL,
-        to_emails=recipient_email,
-        subject=subject,
-        plain_text_content=body
-    )
-    
     try:
-        sg = SendGridAPIClient(sendgrid_api_key)
-        response = sg.send(message)
-        if response.status_code == 202: # 222 is the status code for "accepted"
-            print(f"✅ Email sent successfully to {recipient_email}")
-            return f"Successfully sent the email to {recipient_email}."
-        else:
-            return f"Error: Failed to send email. Status code: {response.status_code}"
-    except Exception as e:
-        print(f"❌ An error occurred while sending email: {e}")
+        outbox_id = queue_email(recipient_email, subject, body)
+    except Exception:
+        logger.exception("An error occurred while queueing email")
         return "An unexpected error occurred while trying to send the email."
+    return f"The email to {recipient_email} has been queued for delivery (reference #{outbox_id})."
+
+
+@traced("email")
+async def deliver_email(recipient_email: str, subject: str, body: str) -> None:
+    """
+    Delivers one email through the shared SendGrid client. Used by the outbox worker.
+    Raises an exception if the email was not accepted, so the worker can retry it.
+    """
+    await get_email_client().send(recipient_email, subject, body)
+    logger.info("Email sent to %s", recipient_email, extra={"sampled": True})
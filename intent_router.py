@@ -0,0 +1,195 @@
+import math
+import re
+import threading
+from collections import Counter
+
+from async_database import get_leave_balance
+from email_utils import draft_leave_email
+
+# --- Local Intent Fast Path ---
+# Clear, well-formed requests are answered here without any LLM call.
+# Anything ambiguous returns None so the caller falls through to the OrchestratorAgent.
+
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+DATE_PATTERN = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+REASON_PATTERN = re.compile(r"\b(?:reason(?:\s+is)?\s*[:\-]?|because(?:\s+of)?|due\s+to)\s+(.+?)\s*[.!?]*$", re.IGNORECASE)
+
+INTENT_RULES = {
+    "balance": [
+        re.compile(r"\b(?:leave|holiday|vacation|pto)\s+balance\b", re.IGNORECASE),
+        re.compile(
+            r"\bhow\s+many\s+(?:leave\s+|holiday\s+|vacation\s+|pto\s+)?days\s+"
+            r"(?:do\s+i\s+have(?!\s+to\b)|have\s+i\s+got|(?:are\s+)?(?:left|remaining))\b",
+            re.IGNORECASE,
+        ),
+        re.compile(
+            r"\b(?:check|show|what\s+is|what's)\s+my\s+(?:current\s+|remaining\s+)?"
+            r"(?:leave\s+|holiday\s+|vacation\s+|pto\s+)?balance\b",
+            re.IGNORECASE,
+        ),
+    ],
+    "draft_email": [
+        re.compile(r"\b(?:draft|write|compose|prepare)\b.*\bleave\b.*\b(?:email|mail|request|letter)\b", re.IGNORECASE),
+    ],
+}
+
+# Requests that must always reach the agents (sending, editing a previous draft, negations, ...)
+FALLTHROUGH_RULES = [
+    re.compile(r"\b(?:not|don't|dont|never|without)\b", re.IGNORECASE),
+    re.compile(r"\b(?:send|edit|change|rewrite|make\s+it|shorter|longer|casual|formal|approve|reject|cancel)\b", re.IGNORECASE),
+]
+
+INTENT_EXAMPLES = {
+    "balance": [
+        "what is my leave balance",
+        "check my leave balance",
+        "how many leave days do i have left",
+        "show my remaining vacation days",
+        "how much leave do i have",
+    ],
+    "draft_email": [
+        "draft a leave email",
+        "write a leave request email",
+        "draft a leave request from to because",
+        "compose an email asking for leave",
+        "prepare a leave application email",
+    ],
+    "other": [
+        "send the email to my manager",
+        "make it more casual",
+        "edit the draft",
+        "hello",
+        "approve request",
+        "how many days until my leave starts",
+        "do i have to fill a form",
+        "what is the leave policy",
+        "work life balance",
+    ],
+}
+
+SIMILARITY_THRESHOLD = 0.55
+SIMILARITY_MARGIN = 0.1
+
+
+def _ngrams(text: str, n: int = 3) -> Counter:
+    """
+    Character n-gram counts for a message, with emails and dates masked out
+    so they do not skew the similarity score.
+    """
+    text = EMAIL_PATTERN.sub(" ", text.lower())
+    text = DATE_PATTERN.sub(" ", text)
+    padded = f" {' '.join(re.findall(r'[a-z]+', text))} "
+    return Counter(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+
+def _normalise(vector: Counter) -> dict:
+    norm = math.sqrt(sum(count * count for count in vector.values())) or 1.0
+    return {gram: count / norm for gram, count in vector.items()}
+
+
+# One unit-length centroid vector per intent, built once at import time.
+INTENT_VECTORS = {
+    intent: _normalise(sum((_ngrams(example) for example in examples), Counter()))
+    for intent, examples in INTENT_EXAMPLES.items()
+}
+
+
+def _similarities(message: str) -> dict:
+    vector = _normalise(_ngrams(message))
+    return {
+        intent: sum(weight * centroid.get(gram, 0.0) for gram, weight in vector.items())
+        for intent, centroid in INTENT_VECTORS.items()
+    }
+
+
+class IntentRouter:
+    """
+    Classifies chat messages with compiled rules plus an n-gram similarity model
+    and answers confident balance/draft requests directly.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = Counter()
+
+    def classify(self, message: str) -> str | None:
+        """
+        Returns 'balance' or 'draft_email' when the intent is clear, else None.
+        """
+        if any(rule.search(message) for rule in FALLTHROUGH_RULES):
+            return None
+
+        scores = _similarities(message)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best_intent, best_score = ranked[0]
+        margin = best_score - ranked[1][1]
+
+        for intent, rules in INTENT_RULES.items():
+            if any(rule.search(message) for rule in rules):
+                # A rule hit still needs the model to agree, or at least to find the message close to the intent.
+                if best_intent == intent or scores[intent] >= SIMILARITY_THRESHOLD:
+                    return intent
+                return None
+
+        if best_intent != "other" and best_score >= SIMILARITY_THRESHOLD and margin >= SIMILARITY_MARGIN:
+            return best_intent
+        return None
+
+    async def try_handle(self, message: str, user_id: str) -> str | None:
+        """
+        Answers the message locally if possible.
+        Returns the reply text, or None if the message should go to the agents.
+        """
+        intent = self.classify(message)
+        reply = None
+        if intent == "balance":
+            reply = await self._handle_balance(message, user_id)
+        elif intent == "draft_email":
+            reply = self._handle_draft(message, user_id)
+
+        with self._lock:
+            if reply is None:
+                self._counters["misses"] += 1
+            else:
+                self._counters["hits"] += 1
+                self._counters[f"hits.{intent}"] += 1
+        return reply
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        total = counters.get("hits", 0) + counters.get("misses", 0)
+        counters.setdefault("hits", 0)
+        counters.setdefault("misses", 0)
+        counters["hit_rate"] = counters["hits"] / total if total else 0.0
+        return counters
+
+    @staticmethod
+    def _employee_email(message: str, user_id: str) -> str | None:
+        match = EMAIL_PATTERN.search(message)
+        if match:
+            return match.group(0)
+        if EMAIL_PATTERN.fullmatch(user_id):
+            return user_id
+        return None
+
+    async def _handle_balance(self, message: str, user_id: str) -> str | None:
+        employee_email = self._employee_email(message, user_id)
+        if not employee_email:
+            return None
+        balance = await get_leave_balance(employee_email)
+        if balance is None:
+            return f"I couldn't find an employee with the email {employee_email}."
+        return f"The current leave balance for {employee_email} is {balance:g} days."
+
+    def _handle_draft(self, message: str, user_id: str) -> str | None:
+        employee_email = self._employee_email(message, user_id)
+        dates = DATE_PATTERN.findall(message)
+        reason = REASON_PATTERN.search(message)
+        if not employee_email or len(dates) != 2 or not reason:
+            return None
+        start_date, end_date = sorted(dates)
+        return draft_leave_email(employee_email, start_date, end_date, reason.group(1))
+
+
+intent_router = IntentRouter()
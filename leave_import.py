@@ -0,0 +1,230 @@
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+from datetime import date
+
+from database import engine
+from log_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# --- BULK LEAVE REQUEST IMPORT ---
+# Rows are read as a stream and processed in fixed-size batches, so memory use does
+# not grow with the file. Each batch resolves employee emails with one query, is
+# COPY'd into a temporary staging table and merged into leave_requests.
+# Imported rows are historical records: employee balances are not adjusted.
+
+IMPORT_BATCH_SIZE = int(os.getenv("LEAVE_IMPORT_BATCH_SIZE", "5000"))
+MAX_REPORTED_ERRORS = int(os.getenv("LEAVE_IMPORT_MAX_ERRORS", "1000"))
+VALID_STATUSES = {"pending", "approved", "rejected"}
+
+STAGING_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS leave_import_staging (
+        line_number BIGINT NOT NULL,
+        employee_id BIGINT NOT NULL,
+        start_date DATE NOT NULL,
+        end_date DATE NOT NULL,
+        reason TEXT,
+        status TEXT NOT NULL
+    ) ON COMMIT DELETE ROWS
+"""
+COPY_STAGING_SQL = (
+    "COPY leave_import_staging (line_number, employee_id, start_date, end_date, reason, status) "
+    "FROM STDIN WITH (FORMAT csv)"
+)
+EMPLOYEE_IDS_SQL = "SELECT email, id FROM employees WHERE email = ANY(%s)"
+# A row is a duplicate if the employee already has a request with the same dates,
+# or an earlier line of the same batch does.
+DUPLICATES_SQL = """
+    SELECT staging.line_number
+    FROM leave_import_staging AS staging
+    WHERE EXISTS (
+        SELECT 1 FROM leave_requests
+        WHERE leave_requests.employee_id = staging.employee_id
+          AND leave_requests.start_date = staging.start_date
+          AND leave_requests.end_date = staging.end_date
+    )
+    OR EXISTS (
+        SELECT 1 FROM leave_import_staging AS earlier
+        WHERE earlier.employee_id = staging.employee_id
+          AND earlier.start_date = staging.start_date
+          AND earlier.end_date = staging.end_date
+          AND earlier.line_number < staging.line_number
+    )
+"""
+MERGE_SQL = """
+    INSERT INTO leave_requests (employee_id, start_date, end_date, reason, status)
+    SELECT employee_id, start_date, end_date, reason, status
+    FROM leave_import_staging
+    WHERE line_number <> ALL(%s)
+"""
+
+
+def read_rows(stream, file_format: str):
+    """
+    Yields (line_number, row_dict) from a CSV or JSON Lines text stream.
+    """
+    if file_format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif file_format == "jsonl":
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, {"_error": f"invalid JSON: {e.msg}"}
+                continue
+            yield line_number, row if isinstance(row, dict) else {"_error": "expected a JSON object"}
+    else:
+        raise ValueError(f"Unsupported import format: {file_format}")
+
+
+def validate_row(row: dict) -> tuple[dict | None, str | None]:
+    """
+    Checks one input row. Returns (parsed_row, None) or (None, error_message).
+    """
+    if "_error" in row:
+        return None, row["_error"]
+    # JSON Lines values can be numbers, lists or objects; every field must be text.
+    for field in ("employee_email", "start_date", "end_date", "reason", "status"):
+        value = row.get(field)
+        if value is not None and not isinstance(value, str):
+            return None, f"{field} must be a string"
+
+    employee_email = (row.get("employee_email") or "").strip()
+    if not employee_email:
+        return None, "employee_email is required"
+
+    try:
+        start_date = date.fromisoformat((row.get("start_date") or "").strip())
+        end_date = date.fromisoformat((row.get("end_date") or "").strip())
+    except ValueError:
+        return None, "start_date and end_date must be YYYY-MM-DD dates"
+    if end_date < start_date:
+        return None, "end_date is before start_date"
+
+    status = (row.get("status") or "pending").strip().lower()
+    if status not in VALID_STATUSES:
+        return None, f"status must be one of {sorted(VALID_STATUSES)}"
+
+    return {
+        "employee_email": employee_email,
+        "start_date": start_date,
+        "end_date": end_date,
+        "reason": row.get("reason") or "",
+        "status": status,
+    }, None
+
+
+class _ImportReport:
+    def __init__(self):
+        self.rows_read = 0
+        self.imported = 0
+        self.rejected = 0
+        self.errors = []
+
+    def error(self, line_number: int, message: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_number, "error": message})
+
+    def as_dict(self) -> dict:
+        return {
+            "rows_read": self.rows_read,
+            "imported": self.imported,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "errors_truncated": self.rejected > len(self.errors),
+        }
+
+
+def _flush_batch(connection, batch: list, report: _ImportReport) -> None:
+    """
+    Resolves, stages and merges one batch of validated rows in a single transaction.
+    """
+    cursor = connection.cursor()
+    try:
+        # Long imports must not trip the API's per-statement timeout.
+        cursor.execute("SET LOCAL statement_timeout = 0")
+        cursor.execute(STAGING_DDL)
+
+        emails = list({row["employee_email"] for _, row in batch})
+        cursor.execute(EMPLOYEE_IDS_SQL, (emails,))
+        employee_ids = dict(cursor.fetchall())
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        staged = 0
+        for line_number, row in batch:
+            employee_id = employee_ids.get(row["employee_email"])
+            if employee_id is None:
+                report.error(line_number, f"no employee found with email {row['employee_email']}")
+                continue
+            writer.writerow([line_number, employee_id, row["start_date"], row["end_date"], row["reason"], row["status"]])
+            staged += 1
+
+        if staged:
+            buffer.seek(0)
+            cursor.copy_expert(COPY_STAGING_SQL, buffer)
+            cursor.execute(DUPLICATES_SQL)
+            duplicates = [line_number for (line_number,) in cursor.fetchall()]
+            for line_number in duplicates:
+                report.error(line_number, "duplicate of an existing leave request")
+            cursor.execute(MERGE_SQL, (duplicates,))
+            report.imported += cursor.rowcount
+
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def import_leave_requests(stream, file_format: str = "csv") -> dict:
+    """
+    Imports leave requests from a CSV or JSON Lines text stream.
+    Expected fields: employee_email, start_date, end_date, reason, status (optional, default 'pending').
+    Returns a summary with per-row validation errors (capped at LEAVE_IMPORT_MAX_ERRORS).
+    """
+    logger.info("Starting %s import of leave requests", file_format)
+    report = _ImportReport()
+    connection = engine.raw_connection()
+    try:
+        batch = []
+        for line_number, row in read_rows(stream, file_format):
+            report.rows_read += 1
+            parsed, error = validate_row(row)
+            if error:
+                report.error(line_number, error)
+                continue
+            batch.append((line_number, parsed))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                _flush_batch(connection, batch, report)
+                batch = []
+        if batch:
+            _flush_batch(connection, batch, report)
+    finally:
+        connection.close()
+
+    logger.info("Import finished: %s rows imported, %s rejected out of %s", report.imported, report.rejected, report.rows_read)
+    return report.as_dict()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import leave requests from a CSV or JSON Lines file.")
+    parser.add_argument("path", help="File to import")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Defaults to the file extension")
+    args = parser.parse_args()
+
+    setup_logging()
+    file_format = args.format or ("jsonl" if args.path.endswith((".jsonl", ".ndjson")) else "csv")
+    with open(args.path, newline="", encoding="utf-8") as stream:
+        summary = import_leave_requests(stream, file_format)
+    print(json.dumps(summary, indent=2))
@@ -0,0 +1,232 @@
+import argparse
+import logging
+from datetime import date
+
+from sqlalchemy import text
+
+from database import LEDGER_WRITE_LOCK_QUERY, balance_cache, engine, get_leave_balance, get_leave_balance_as_of
+from log_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# --- LEAVE LEDGER ---
+# Balances are no longer stored on the employee row. Every change is an
+# append-only leave_ledger entry with signed days (opening, accrual, deduction,
+# adjustment), and leave_balance_snapshots holds each employee's balance at the
+# end of a past day. The balance as of any date is the latest snapshot on or
+# before it plus the ledger entries effective after that snapshot, up to the date,
+# so a lookup never scans more than the entries since the last snapshot.
+#
+# Snapshots are only taken for days that have ended by the database's clock;
+# entries are effective on the database's CURRENT_DATE by default, so they land
+# after the latest snapshot. Entries dated on or before an existing snapshot
+# (back-dated adjustments, approvals that straddle midnight) also add their days
+# to those snapshots, in the same statement. Writers hold LEDGER_WRITE_LOCK_QUERY
+# shared and snapshots hold it exclusively (SNAPSHOT_LOCK_QUERY), so neither
+# misses the other.
+#
+# The CLI runs in its own process: it clears its own balance_cache, but a running
+# app keeps serving its cached balance for up to BALANCE_CACHE_TTL seconds.
+#
+#   python ledger.py snapshot [--as-of YYYY-MM-DD]      (run daily, e.g. from cron)
+#   python ledger.py balance EMAIL [--as-of YYYY-MM-DD]
+#   python ledger.py entry EMAIL accrual 1.5 --note "Monthly accrual"
+
+LEDGER_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS leave_ledger (
+        id BIGSERIAL PRIMARY KEY,
+        employee_id INTEGER NOT NULL REFERENCES employees (id),
+        entry_type TEXT NOT NULL CHECK (entry_type IN ('opening', 'accrual', 'deduction', 'adjustment')),
+        days NUMERIC(8, 2) NOT NULL,
+        effective_date DATE NOT NULL DEFAULT CURRENT_DATE,
+        request_id INTEGER REFERENCES leave_requests (id),
+        note TEXT,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+    # Covers the per-employee range sum, including days, so it needs no heap access.
+    "CREATE INDEX IF NOT EXISTS leave_ledger_employee_date_idx ON leave_ledger (employee_id, effective_date) INCLUDE (days)",
+    # A request can only ever be deducted once.
+    "CREATE UNIQUE INDEX IF NOT EXISTS leave_ledger_request_deduction_uidx ON leave_ledger (request_id) WHERE entry_type = 'deduction'",
+    """
+    CREATE TABLE IF NOT EXISTS leave_balance_snapshots (
+        employee_id INTEGER NOT NULL REFERENCES employees (id),
+        as_of DATE NOT NULL,
+        balance NUMERIC(8, 2) NOT NULL,
+        PRIMARY KEY (employee_id, as_of)
+    )
+    """,
+    """
+    CREATE OR REPLACE FUNCTION leave_balance_as_of(p_employee_id INTEGER, p_as_of DATE) RETURNS NUMERIC
+    LANGUAGE sql STABLE AS $$
+        WITH snapshot AS (
+            SELECT as_of, balance FROM leave_balance_snapshots
+            WHERE employee_id = p_employee_id AND as_of <= p_as_of
+            ORDER BY as_of DESC
+            LIMIT 1
+        )
+        SELECT COALESCE((SELECT balance FROM snapshot), 0) + COALESCE((
+            SELECT SUM(days) FROM leave_ledger
+            WHERE employee_id = p_employee_id
+              AND effective_date > COALESCE((SELECT as_of FROM snapshot), CAST('-infinity' AS DATE))
+              AND effective_date <= p_as_of
+        ), 0)
+    $$
+    """,
+    # Employees created with a leave_balance (seed scripts, HR tooling) get it as their opening entry.
+    """
+    CREATE OR REPLACE FUNCTION leave_ledger_opening_entry() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO leave_ledger (employee_id, entry_type, days, note)
+        VALUES (NEW.id, 'opening', NEW.leave_balance, 'Opening balance');
+        RETURN NEW;
+    END
+    $$
+    """,
+    "DROP TRIGGER IF EXISTS employees_opening_balance ON employees",
+    """
+    CREATE TRIGGER employees_opening_balance AFTER INSERT ON employees
+    FOR EACH ROW EXECUTE FUNCTION leave_ledger_opening_entry()
+    """,
+    # Carry existing balances over as opening entries.
+    """
+    INSERT INTO leave_ledger (employee_id, entry_type, days, note)
+    SELECT id, 'opening', leave_balance, 'Opening balance migrated from employees.leave_balance'
+    FROM employees
+    WHERE NOT EXISTS (SELECT 1 FROM leave_ledger WHERE leave_ledger.employee_id = employees.id)
+    """,
+]
+
+# Version 7: before an employee's first snapshot or entry there is no balance to
+# report, so the function returns NULL (an unknown balance) instead of 0.
+LEDGER_BALANCE_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION leave_balance_as_of(p_employee_id INTEGER, p_as_of DATE) RETURNS NUMERIC
+    LANGUAGE sql STABLE AS $$
+        WITH snapshot AS (
+            SELECT as_of, balance FROM leave_balance_snapshots
+            WHERE employee_id = p_employee_id AND as_of <= p_as_of
+            ORDER BY as_of DESC
+            LIMIT 1
+        ),
+        entries AS (
+            SELECT days FROM leave_ledger
+            WHERE employee_id = p_employee_id
+              AND effective_date > COALESCE((SELECT as_of FROM snapshot), CAST('-infinity' AS DATE))
+              AND effective_date <= p_as_of
+        )
+        SELECT CASE WHEN EXISTS (SELECT 1 FROM snapshot) OR EXISTS (SELECT 1 FROM entries)
+                    THEN COALESCE((SELECT balance FROM snapshot), 0) + COALESCE((SELECT SUM(days) FROM entries), 0)
+               END
+    $$
+    """,
+]
+
+# Exclusive counterpart of LEDGER_WRITE_LOCK_QUERY: waits for in-flight ledger writes.
+SNAPSHOT_LOCK_QUERY = text("SELECT pg_advisory_xact_lock(hashtext('leave_ledger_snapshot'))")
+# "Yesterday" and "today" come from the database, the same clock entries are dated by.
+SNAPSHOT_DATE_QUERY = text(
+    "SELECT COALESCE(CAST(:as_of AS DATE), CURRENT_DATE - 1) AS as_of, CURRENT_DATE AS today"
+)
+SNAPSHOT_QUERY = text(
+    """
+    INSERT INTO leave_balance_snapshots (employee_id, as_of, balance)
+    SELECT id, CAST(:as_of AS DATE), leave_balance_as_of(id, CAST(:as_of AS DATE))
+    FROM employees
+    ON CONFLICT (employee_id, as_of) DO UPDATE SET balance = EXCLUDED.balance
+    """
+)
+ADD_ENTRY_QUERY = text(
+    """
+    WITH entry AS (
+        INSERT INTO leave_ledger (employee_id, entry_type, days, effective_date, note)
+        SELECT id, :entry_type, :days, COALESCE(CAST(:effective_date AS DATE), CURRENT_DATE), :note
+        FROM employees WHERE email = :email
+        RETURNING id, employee_id, days, effective_date
+    ),
+    resnapshotted AS (
+        UPDATE leave_balance_snapshots
+        SET balance = leave_balance_snapshots.balance + entry.days
+        FROM entry
+        WHERE leave_balance_snapshots.employee_id = entry.employee_id
+          AND leave_balance_snapshots.as_of >= entry.effective_date
+    )
+    SELECT id FROM entry
+    """
+)
+
+
+def snapshot_balances(as_of: date | None = None) -> int:
+    """
+    Stores every employee's balance at the end of as_of (default: yesterday, by
+    the database's clock). Each snapshot builds on the previous one, so daily runs
+    stay cheap. Returns the number of snapshots written.
+    """
+    with engine.begin() as connection:
+        # Snapshotting every employee must not trip the API's per-statement timeout.
+        connection.execute(text("SET LOCAL statement_timeout = 0"))
+        connection.execute(SNAPSHOT_LOCK_QUERY)
+        dates = connection.execute(SNAPSHOT_DATE_QUERY, {"as_of": as_of}).one()
+        as_of = dates.as_of
+        if as_of >= dates.today:
+            raise ValueError("Snapshots can only be taken for days that have ended.")
+        written = connection.execute(SNAPSHOT_QUERY, {"as_of": as_of}).rowcount
+    logger.info("Snapshotted %s balances as of %s", written, as_of)
+    return written
+
+
+def add_ledger_entry(employee_email: str, entry_type: str, days: float, note: str | None = None,
+                     effective_date: date | None = None) -> int | None:
+    """
+    Appends an accrual or adjustment (signed days) to an employee's ledger, and to
+    any snapshots taken on or after effective_date.
+    Returns the entry id, or None if the employee does not exist.
+
+    Only this process's balance_cache is invalidated; other processes pick the
+    change up when their cached balance expires.
+    """
+    if entry_type not in ("accrual", "adjustment"):
+        raise ValueError("Only accrual and adjustment entries can be added by hand.")
+    with engine.begin() as connection:
+        connection.execute(LEDGER_WRITE_LOCK_QUERY)
+        entry_id = connection.execute(ADD_ENTRY_QUERY, {
+            "email": employee_email,
+            "entry_type": entry_type,
+            "days": days,
+            "effective_date": effective_date,
+            "note": note,
+        }).scalar_one_or_none()
+    balance_cache.invalidate(employee_email)
+    if entry_id is None:
+        logger.warning("No employee found with email: %s", employee_email)
+    return entry_id
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain and query the leave ledger.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    snapshot = commands.add_parser("snapshot", help="Snapshot every balance at the end of a past day")
+    snapshot.add_argument("--as-of", type=date.fromisoformat, help="Defaults to yesterday")
+    balance = commands.add_parser("balance", help="Show an employee's balance on a date")
+    balance.add_argument("email")
+    balance.add_argument("--as-of", type=date.fromisoformat, help="Defaults to the current balance")
+    entry = commands.add_parser("entry", help="Add an accrual or adjustment")
+    entry.add_argument("email")
+    entry.add_argument("entry_type", choices=["accrual", "adjustment"])
+    entry.add_argument("days", type=float, help="Signed number of days")
+    entry.add_argument("--note")
+    entry.add_argument("--effective-date", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    setup_logging()
+    if args.command == "snapshot":
+        snapshot_balances(args.as_of)
+    elif args.command == "balance":
+        if args.as_of is None:
+            print(get_leave_balance(args.email))
+        else:
+            print(get_leave_balance_as_of(args.email, args.as_of.isoformat()))
+    else:
+        add_ledger_entry(args.email, args.entry_type, args.days, args.note, args.effective_date)
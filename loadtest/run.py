@@ -0,0 +1,219 @@
+"""
+End-to-end load test for the leave management API.
+
+Start the dependencies and the app with the local stand-ins:
+
+    python -m loadtest.stub_sendgrid --port 8025 &
+    python -m loadtest.seed
+    MODEL_BACKEND=stub SENDGRID_API_HOST=http://127.0.0.1:8025 SENDGRID_API_KEY=stub \\
+        uvicorn app:app --port 8000 &
+
+To replay real Gemini traffic instead of the stub, capture it once with
+MODEL_BACKEND=record and then run the app with MODEL_BACKEND=replay (and
+REPLAY_LATENCY=recorded to keep the original model latency).
+
+Then drive it:
+
+    python -m loadtest.run --concurrency 32 --requests 5000 \\
+        --mix chat_balance=4,chat_agent=2,rest_balance=3,rest_create=1,rest_decide=1 \\
+        --output results.json
+
+Results are written as JSON. No baseline ships with the repo, because latencies
+only compare on the same hardware and database. To get one, run the command above
+on the reference machine from a known-good commit and keep its --output file.
+Later runs on that machine can then pass --baseline baseline.json: each
+scenario's p95 and error rate are compared against the stored run and the exit
+code is 1 on a regression.
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import httpx
+
+from loadtest.seed import EMAIL_TEMPLATE
+
+DEFAULT_MIX = "chat_balance=4,chat_agent=2,rest_balance=3,rest_create=1,rest_decide=1"
+
+
+def build_request(scenario: str, rng: random.Random, employees: int, max_request_id: int) -> tuple[str, str, dict | None]:
+    """
+    Returns (method, path, json_body) for one request of the given scenario.
+    """
+    email = EMAIL_TEMPLATE.format(rng.randrange(employees))
+    if scenario == "chat_balance":
+        return "POST", "/chat", {"message": "What is my leave balance?", "user_id": email}
+    if scenario == "chat_agent":
+        message = rng.choice([
+            f"Please send an email to {email} saying I will be late today.",
+            f"Draft a leave email for {email}",
+            "Make it more casual",
+        ])
+        return "POST", "/chat", {"message": message, "user_id": email}
+    if scenario == "rest_balance":
+        return "GET", f"/employees/{email}/balance", None
+    if scenario == "rest_create":
+        start = date(2026, 1, 1) + timedelta(days=rng.randrange(365))
+        return "POST", "/leave-requests", {
+            "employee_email": email,
+            "start_date": start.isoformat(),
+            "end_date": (start + timedelta(days=rng.randrange(3))).isoformat(),
+            "reason": "load test",
+        }
+    if scenario == "rest_decide":
+        decision = rng.choice(["approved", "rejected"])
+        return "POST", f"/leave-requests/{rng.randint(1, max_request_id)}/decision", {"decision": decision}
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarise(latencies: list, errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    total = len(latencies)
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": errors / total if total else 0.0,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+async def run_load(args) -> dict:
+    weights = parse_mix(args.mix)
+    scenarios, scenario_weights = list(weights), list(weights.values())
+    rng = random.Random(args.seed)
+    plan = rng.choices(scenarios, weights=scenario_weights, k=args.requests)
+
+    results = {name: {"latencies": [], "errors": 0} for name in scenarios}
+    next_index = 0
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        async def worker(worker_id: int):
+            nonlocal next_index
+            worker_rng = random.Random(args.seed * 1000 + worker_id)
+            while next_index < len(plan):
+                scenario = plan[next_index]
+                next_index += 1
+                method, path, body = build_request(scenario, worker_rng, args.employees, args.max_request_id)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body)
+                    # 404/422 are valid business outcomes (e.g. an already-decided request).
+                    failed = response.status_code >= 500 or response.status_code == 429
+                except httpx.HTTPError:
+                    failed = True
+                results[scenario]["latencies"].append(time.perf_counter() - started)
+                if failed:
+                    results[scenario]["errors"] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    all_latencies = [latency for result in results.values() for latency in result["latencies"]]
+    all_errors = sum(result["errors"] for result in results.values())
+    return {
+        "run_at": datetime.now(timezone.utc).isoformat(),
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "config": {
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "mix": weights,
+            "seed": args.seed,
+        },
+        "elapsed_seconds": elapsed,
+        "overall": summarise(all_latencies, all_errors, elapsed),
+        "scenarios": {
+            name: summarise(result["latencies"], result["errors"], elapsed)
+            for name, result in results.items()
+        },
+    }
+
+
+def compare(current: dict, baseline: dict, max_regression: float, max_error_increase: float) -> list[str]:
+    """
+    Returns a description of every scenario whose p95 grew by more than
+    max_regression (a fraction) or whose error rate grew by more than max_error_increase.
+    """
+    regressions = []
+    for name, stats in current["scenarios"].items():
+        reference = baseline.get("scenarios", {}).get(name)
+        if not reference:
+            continue
+        if reference["p95_ms"] and stats["p95_ms"] > reference["p95_ms"] * (1 + max_regression):
+            regressions.append(f"{name}: p95 {stats['p95_ms']:.1f} ms vs baseline {reference['p95_ms']:.1f} ms")
+        if stats["error_rate"] > reference["error_rate"] + max_error_increase:
+            regressions.append(f"{name}: error rate {stats['error_rate']:.2%} vs baseline {reference['error_rate']:.2%}")
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    print(f"{'scenario':<14} {'reqs':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, stats in list(report["scenarios"].items()) + [("overall", report["overall"])]:
+        print(
+            f"{name:<14} {stats['requests']:>7} {stats['throughput_rps']:>8.1f} {stats['p50_ms']:>8.1f} "
+            f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['error_rate']:>7.2%}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the leave management API.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Comma-separated scenario=weight pairs")
+    parser.add_argument("--employees", type=int, default=1000, help="Number of seeded load-test employees")
+    parser.add_argument("--max-request-id", type=int, default=20000, help="Highest seeded leave request id")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the results JSON here")
+    parser.add_argument("--baseline", help="Compare against this results JSON")
+    parser.add_argument("--max-regression", type=float, default=0.10, help="Allowed p95 growth, as a fraction")
+    parser.add_argument("--max-error-increase", type=float, default=0.01, help="Allowed error-rate growth")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(args))
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(report, baseline, args.max_regression, args.max_error_increase)
+        for regression in regressions:
+            print(f"❌ Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against the baseline.")
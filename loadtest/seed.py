@@ -0,0 +1,72 @@
+"""
+Creates the schema and a deterministic data set for load tests.
+
+    python -m loadtest.seed --employees 1000 --requests 20000
+
+Point DB_HOST / DB_PORT / DB_NAME at a local, disposable PostgreSQL first.
+The SQL in database.py is PostgreSQL-specific, so SQLite is not supported.
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from database import engine
+from setup_database import migrate
+
+EMAIL_TEMPLATE = "loadtest-user-{}@example.com"
+
+
+def seed(employees: int, requests: int, seed_value: int = 42) -> None:
+    """
+    Inserts `employees` employees and `requests` pending leave requests.
+    Existing load-test employees are reused, so seeding is repeatable.
+    """
+    migrate()
+    rng = random.Random(seed_value)
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                """
+                INSERT INTO employees (name, email, leave_balance)
+                SELECT 'Load Test ' || n, :prefix || n || '@example.com', 10000
+                FROM generate_series(0, :count - 1) AS n
+                ON CONFLICT (email) DO NOTHING
+                """
+            ),
+            {"prefix": "loadtest-user-", "count": employees},
+        )
+        employee_ids = connection.execute(
+            text("SELECT id FROM employees WHERE email LIKE 'loadtest-user-%@example.com' ORDER BY id")
+        ).scalars().all()
+
+        rows = []
+        for _ in range(requests):
+            start = date(2025, 1, 1) + timedelta(days=rng.randrange(365))
+            rows.append({
+                "employee_id": rng.choice(employee_ids),
+                "start_date": start,
+                "end_date": start + timedelta(days=rng.randrange(5)),
+                "reason": "load test",
+            })
+        if rows:
+            connection.execute(
+                text(
+                    """
+                    INSERT INTO leave_requests (employee_id, start_date, end_date, reason, status)
+                    VALUES (:employee_id, :start_date, :end_date, :reason, 'pending')
+                    """
+                ),
+                rows,
+            )
+    print(f"✅ Seeded {employees} employees and {requests} pending leave requests.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed a local database for load tests.")
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    seed(args.employees, args.requests, args.seed)
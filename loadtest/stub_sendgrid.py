@@ -0,0 +1,43 @@
+"""
+A local stand-in for the SendGrid v3 mail API, for load tests.
+
+    python -m loadtest.stub_sendgrid --port 8025 --latency 0.05
+
+Point the app at it with SENDGRID_API_HOST=http://127.0.0.1:8025 (any SENDGRID_API_KEY).
+Every POST /v3/mail/send is accepted with 202 after the configured latency.
+"""
+import argparse
+import asyncio
+import os
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+app = FastAPI(title="SendGrid stand-in")
+app.state.latency = float(os.getenv("STUB_SENDGRID_LATENCY", "0"))
+app.state.accepted = 0
+
+
+@app.post("/v3/mail/send")
+async def send(request: Request):
+    await request.body()
+    if app.state.latency:
+        await asyncio.sleep(app.state.latency)
+    app.state.accepted += 1
+    return Response(status_code=202)
+
+
+@app.get("/stats")
+async def stats():
+    return {"accepted": app.state.accepted}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local SendGrid stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--latency", type=float, default=app.state.latency, help="Seconds to wait before answering")
+    args = parser.parse_args()
+
+    app.state.latency = args.latency
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,80 @@
+# A tiny registry of named stats collectors, served as JSON by GET /metrics.
+import bisect
+import threading
+
+_collectors = {}
+
+
+def register(name: str, collector) -> None:
+    """
+    Registers a zero-argument callable that returns a dict of stats.
+    """
+    _collectors[name] = collector
+
+
+def collect() -> dict:
+    """
+    Calls every registered collector. A failing collector reports its error
+    instead of breaking the whole response.
+    """
+    snapshot = {}
+    for name, collector in _collectors.items():
+        try:
+            snapshot[name] = collector()
+        except Exception as e:
+            snapshot[name] = {"error": str(e)}
+    return snapshot
+
+
+# Upper bounds in seconds, from a fast cache hit to a slow multi-agent turn.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """
+    Thread-safe latency histogram with fixed buckets. Percentiles are
+    estimated as the upper bound of the bucket they fall into.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+
+    def _percentile(self, fraction: float) -> float:
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.buckets, self._counts):
+                cumulative += count
+                buckets[f"le_{bound:g}"] = cumulative
+            buckets["le_inf"] = self.count
+            return {
+                "count": self.count,
+                "sum_seconds": self.sum,
+                "avg_seconds": self.sum / self.count if self.count else 0.0,
+                "max_seconds": self.max,
+                "p50_seconds": self._percentile(0.50),
+                "p95_seconds": self._percentile(0.95),
+                "p99_seconds": self._percentile(0.99),
+                "buckets": buckets,
+            }
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import os
+import random
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# --- EMAIL OUTBOX ---
+# Emails are written to email_outbox in the same transaction as the change that
+# triggers them, and a background worker delivers them in batches.
+
+# Approvals are also copied to the employee's manager and, when HR_EMAIL is set, to
+# HR; each copy is its own outbox row, so the worker sends them concurrently and
+# retries them independently.
+HR_EMAIL = os.getenv("HR_EMAIL")
+
+OUTBOX_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS email_outbox (
+        id BIGSERIAL PRIMARY KEY,
+        recipient TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        body TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        sent_at TIMESTAMPTZ
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS email_outbox_due_idx
+        ON email_outbox (next_attempt_at) WHERE status = 'pending'
+    """,
+]
+
+ENQUEUE_EMAIL_QUERY = text(
+    """
+    INSERT INTO email_outbox (recipient, subject, body)
+    VALUES (:recipient, :subject, :body)
+    RETURNING id
+    """
+)
+
+# Claim a batch by pushing next_attempt_at forward (a lease), so the rows are not
+# locked while the emails are being sent and other workers skip them.
+CLAIM_BATCH_QUERY = text(
+    """
+    UPDATE email_outbox
+    SET attempts = attempts + 1,
+        next_attempt_at = now() + make_interval(secs => :lease_seconds)
+    WHERE id IN (
+        SELECT id FROM email_outbox
+        WHERE status = 'pending' AND next_attempt_at <= now()
+        ORDER BY next_attempt_at
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, recipient, subject, body, attempts
+    """
+)
+MARK_SENT_QUERY = text("UPDATE email_outbox SET status = 'sent', sent_at = now(), last_error = NULL WHERE id = ANY(:ids)")
+MARK_FAILED_QUERY = text(
+    """
+    UPDATE email_outbox
+    SET status = CASE WHEN attempts >= :max_attempts THEN 'dead' ELSE 'pending' END,
+        last_error = :error,
+        next_attempt_at = now() + make_interval(secs => :retry_in)
+    WHERE id = :id
+    """
+)
+
+
+def decision_notification(request_id: int, status: str) -> tuple[str, str]:
+    """
+    Returns the (subject, body) of the email sent when a leave request is decided.
+    """
+    subject = f"Your leave request #{request_id} has been {status}"
+    body = f"""
+    Hello,
+
+    Your leave request #{request_id} has been {status}.
+
+    Best regards,
+    Leave Management System
+    """
+    return subject, body
+
+
+def decision_cc_notification(request_id: int, status: str) -> tuple[str, str]:
+    """
+    Returns the (subject, body) of the copy of a decision sent to the manager and HR.
+    The employee is only known inside the decision query, which fills in {employee_email}.
+    """
+    subject = f"Leave request #{request_id} from {{employee_email}} has been {status}"
+    body = f"""
+    Hello,
+
+    The leave request #{request_id} from {{employee_email}} has been {status}.
+
+    Best regards,
+    Leave Management System
+    """
+    return subject, body
+
+
+def notification_cc(status: str) -> list[str]:
+    """
+    Returns the extra recipients of a decision notification, besides the employee and manager.
+    """
+    if status == "approved" and HR_EMAIL:
+        return [HR_EMAIL]
+    return []
+
+
+class OutboxWorker:
+    """
+    Drains email_outbox in batches with a concurrency limit.
+    Failed sends are retried with exponential backoff and dead-lettered
+    (status 'dead') after max_attempts.
+    """
+
+    def __init__(self, engine, deliver):
+        # deliver is an async callable (recipient, subject, body) that raises on failure.
+        self.engine = engine
+        self.deliver = deliver
+        self.batch_size = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+        self.concurrency = int(os.getenv("OUTBOX_CONCURRENCY", "8"))
+        self.max_attempts = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+        self.poll_interval = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))
+        self.backoff_base = float(os.getenv("OUTBOX_BACKOFF_BASE", "5"))
+        self.backoff_max = float(os.getenv("OUTBOX_BACKOFF_MAX", "900"))
+        self.lease_seconds = float(os.getenv("OUTBOX_LEASE_SECONDS", "300"))
+        self._stop = asyncio.Event()
+        self._task = None
+        self.sent = 0
+        self.failed = 0
+        self.dead_lettered = 0
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task:
+            await self._task
+
+    async def run(self) -> None:
+        logger.info("Outbox worker started")
+        while not self._stop.is_set():
+            try:
+                claimed = await self.drain_once()
+            except Exception:
+                logger.exception("Error draining email outbox")
+                claimed = 0
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        logger.info("Outbox worker stopped")
+
+    async def drain_once(self) -> int:
+        """
+        Claims and delivers one batch. Returns the number of emails claimed.
+        """
+        async with self.engine.begin() as connection:
+            rows = (await connection.execute(
+                CLAIM_BATCH_QUERY, {"batch_size": self.batch_size, "lease_seconds": self.lease_seconds}
+            )).all()
+        if not rows:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send(row):
+            async with semaphore:
+                try:
+                    await self.deliver(row.recipient, row.subject, row.body)
+                    return row, None
+                except Exception as e:
+                    return row, e
+
+        results = await asyncio.gather(*(send(row) for row in rows))
+        sent_ids = [row.id for row, error in results if error is None]
+        failures = [
+            {
+                "id": row.id,
+                "error": str(error)[:1000],
+                "retry_in": self._backoff(row.attempts),
+                "max_attempts": self.max_attempts,
+            }
+            for row, error in results if error is not None
+        ]
+
+        async with self.engine.begin() as connection:
+            if sent_ids:
+                await connection.execute(MARK_SENT_QUERY, {"ids": sent_ids})
+            if failures:
+                await connection.execute(MARK_FAILED_QUERY, failures)
+
+        self.sent += len(sent_ids)
+        self.failed += len(failures)
+        dead = [row.id for row, error in results if error is not None and row.attempts >= self.max_attempts]
+        self.dead_lettered += len(dead)
+        for outbox_id in dead:
+            logger.error("Email %s dead-lettered after %s attempts", outbox_id, self.max_attempts)
+        return len(rows)
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "failed": self.failed, "dead_lettered": self.dead_lettered}
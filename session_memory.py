@@ -0,0 +1,196 @@
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from google.genai import types
+
+# --- Bounded Conversation Memory ---
+# Chat sessions are kept per user_id in an LRU with an idle TTL, and every prompt is
+# trimmed to a token budget before it is sent to the model. Older turns that no
+# longer fit are folded into a short summary so routing and edits keep their context.
+
+CHARS_PER_TOKEN = 4
+SUMMARY_PREFIX = "[Summary of earlier conversation]"
+
+
+def estimate_tokens(content: types.Content) -> int:
+    """
+    Rough token count for one message: ~4 characters per token, including tool calls.
+    """
+    chars = 0
+    for part in content.parts or []:
+        if part.text:
+            chars += len(part.text)
+        if part.function_call:
+            chars += len(part.function_call.name or "") + len(json.dumps(part.function_call.args or {}, default=str))
+        if part.function_response:
+            chars += len(part.function_response.name or "") + len(json.dumps(part.function_response.response or {}, default=str))
+    return chars // CHARS_PER_TOKEN + 1
+
+
+def _has_function_response(content: types.Content) -> bool:
+    return any(part.function_response for part in content.parts or [])
+
+
+def _summarise(contents: list, max_tokens: int) -> types.Content:
+    """
+    Folds dropped turns into one short extractive summary message.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    lines = []
+    for content in contents:
+        text = " ".join(part.text for part in content.parts or [] if part.text).strip()
+        if text:
+            lines.append(f"{content.role}: {' '.join(text.split())[:200]}")
+    summary = "\n".join(lines)
+    if len(summary) > max_chars:
+        summary = "..." + summary[-max_chars:]
+    return types.Content(role="user", parts=[types.Part(text=f"{SUMMARY_PREFIX}\n{summary}")])
+
+
+def _nearest_rank(sorted_values: list, fraction: float) -> int:
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))]
+
+
+class SessionMemory:
+    """
+    Owns chat sessions per user_id (LRU-bounded, idle TTL) and trims each
+    model prompt to a token budget.
+    """
+
+    def __init__(self):
+        self.max_sessions = int(os.getenv("CHAT_MAX_SESSIONS", "5000"))
+        self.session_ttl = float(os.getenv("CHAT_SESSION_TTL", "3600"))
+        self.token_budget = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "4000"))
+        self.summary_budget = int(os.getenv("CHAT_SUMMARY_TOKEN_BUDGET", "400"))
+        self.session_service = None
+        self.app_name = None
+        self._last_used = OrderedDict()
+        self._usage = {}
+        self._session_lock = asyncio.Lock()
+        self._usage_lock = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+
+    def attach(self, session_service, app_name: str) -> None:
+        self.session_service = session_service
+        self.app_name = app_name
+
+    async def get_session(self, user_id: str):
+        """
+        Returns the session for a user, creating it on their first turn.
+        Idle sessions past the TTL and the least recently used ones beyond
+        CHAT_MAX_SESSIONS are deleted.
+        """
+        async with self._session_lock:
+            await self._expire_idle()
+            session = await self.session_service.get_session(
+                app_name=self.app_name, user_id=user_id, session_id=user_id
+            )
+            if session is None:
+                session = await self.session_service.create_session(
+                    app_name=self.app_name, user_id=user_id, session_id=user_id
+                )
+            self._last_used[user_id] = time.monotonic()
+            self._last_used.move_to_end(user_id)
+            while len(self._last_used) > self.max_sessions:
+                oldest, _ = self._last_used.popitem(last=False)
+                await self._delete(oldest)
+                self.evicted += 1
+        return session
+
+    async def _expire_idle(self) -> None:
+        now = time.monotonic()
+        while self._last_used:
+            user_id, last_used = next(iter(self._last_used.items()))
+            if now - last_used < self.session_ttl:
+                break
+            del self._last_used[user_id]
+            await self._delete(user_id)
+            self.expired += 1
+
+    async def _delete(self, user_id: str) -> None:
+        await self.session_service.delete_session(
+            app_name=self.app_name, user_id=user_id, session_id=user_id
+        )
+        with self._usage_lock:
+            self._usage.pop(user_id, None)
+
+    def trim_history(self, callback_context, llm_request):
+        """
+        before_model_callback: keeps the most recent turns that fit in the token
+        budget and replaces older ones with a summary. Never returns a response,
+        so the model call always goes ahead.
+        """
+        contents = list(llm_request.contents or [])
+        sizes = [estimate_tokens(content) for content in contents]
+        tokens_before = sum(sizes)
+
+        if tokens_before > self.token_budget and len(contents) > 1:
+            budget = self.token_budget - self.summary_budget
+            # Always keep the newest message, then walk backwards while it fits.
+            cut = len(contents) - 1
+            used = sizes[cut]
+            while cut > 0 and used + sizes[cut - 1] <= budget:
+                cut -= 1
+                used += sizes[cut]
+            # A tool response must stay with the call that produced it.
+            while cut < len(contents) - 1 and _has_function_response(contents[cut]):
+                cut += 1
+            if cut > 0:
+                summary = _summarise(contents[:cut], self.summary_budget)
+                llm_request.contents = [summary] + contents[cut:]
+
+        tokens_after = sum(estimate_tokens(content) for content in llm_request.contents or [])
+        self._record_usage(callback_context, len(contents), tokens_before, tokens_after)
+        return None
+
+    def _record_usage(self, callback_context, history_messages: int, tokens_before: int, tokens_after: int) -> None:
+        session = callback_context._invocation_context.session
+        with self._usage_lock:
+            usage = self._usage.setdefault(session.user_id, {
+                "model_calls": 0,
+                "prompt_tokens_total": 0,
+                "tokens_trimmed_total": 0,
+            })
+            usage["model_calls"] += 1
+            usage["history_messages"] = history_messages
+            usage["session_events"] = len(session.events)
+            usage["last_prompt_tokens"] = tokens_after
+            usage["prompt_tokens_total"] += tokens_after
+            usage["tokens_trimmed_total"] += tokens_before - tokens_after
+
+    def stats(self) -> dict:
+        # /metrics is unauthenticated and user ids are employee emails, so only
+        # aggregates across sessions are published.
+        with self._usage_lock:
+            usages = [dict(usage) for usage in self._usage.values()]
+        prompt_sizes = sorted(usage.get("last_prompt_tokens", 0) for usage in usages)
+        sessions = {
+            "tracked": len(usages),
+            "model_calls": sum(usage["model_calls"] for usage in usages),
+            "prompt_tokens_total": sum(usage["prompt_tokens_total"] for usage in usages),
+            "tokens_trimmed_total": sum(usage["tokens_trimmed_total"] for usage in usages),
+            "last_prompt_tokens_p50": _nearest_rank(prompt_sizes, 0.50),
+            "last_prompt_tokens_p95": _nearest_rank(prompt_sizes, 0.95),
+            "last_prompt_tokens_max": prompt_sizes[-1] if prompt_sizes else 0,
+            "history_messages_max": max((usage.get("history_messages", 0) for usage in usages), default=0),
+        }
+        return {
+            "active_sessions": len(self._last_used),
+            "max_sessions": self.max_sessions,
+            "session_ttl_seconds": self.session_ttl,
+            "token_budget": self.token_budget,
+            "evicted": self.evicted,
+            "expired": self.expired,
+            "sessions": sessions,
+        }
+
+
+session_memory = SessionMemory()
@@ -1,20 +1,196 @@
+import argparse
+import logging
 import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
-from datetime import date
 
-# Load environment variables from .env file
-load_dotenv()
+from sqlalchemy import text
 
-# --- DATABASE CONNECTION SETUP ---
-DB_HOST = "127.0.0.1" # Connecting via Cloud SQL Proxy
-DB_PORT = "5432"
-DB_USER = "postgres"
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_NAME = "leave_app_db" # Ensure this matches the DB name in Cloud SQL
+from database import engine
+from log_config import setup_logging
+from digest import DIGEST_DDL
+from ledger import LEDGER_BALANCE_DDL, LEDGER_DDL
+from outbox import OUTBOX_DDL
 
-if not DB_PASSWORD:
-    raise ValueError("❌ DB_PASSWORD environment variable not found.")
+logger = logging.getLogger(__name__)
 
-DATABASE_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(DATABASE_URL)
+# --- SCHEMA MIGRATIONS ---
+# Each migration is (version, name, statements) and runs once, in its own transaction.
+# Every statement is also idempotent, so databases that were set up by hand can be
+# brought under this tool safely.
+#
+# The shared engine carries the API's statement and lock timeouts, which index
+# builds and backfills would trip. Each migration transaction lifts the statement
+# timeout and waits up to MIGRATION_LOCK_TIMEOUT_MS for table locks instead.
+
+MIGRATION_LOCK_TIMEOUT_MS = int(os.getenv("MIGRATION_LOCK_TIMEOUT_MS", "60000"))
+
+SCHEMA_MIGRATIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+
+def _add_constraint(table: str, name: str, definition: str) -> str:
+    """
+    ALTER TABLE ... ADD CONSTRAINT has no IF NOT EXISTS, so guard it with pg_constraint.
+    The constraint is added NOT VALID, which skips the scan of existing rows, so the
+    ACCESS EXCLUSIVE lock is brief. Validate it in a later migration: each migration
+    is its own transaction, and VALIDATE CONSTRAINT alone only takes SHARE UPDATE
+    EXCLUSIVE, which lets reads and writes continue during the scan.
+    """
+    return f"""
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = '{name}') THEN
+            ALTER TABLE {table} ADD CONSTRAINT {name} {definition} NOT VALID;
+        END IF;
+    END
+    $$
+    """
+
+
+MIGRATIONS = [
+    (1, "create employees and leave_requests", [
+        """
+        CREATE TABLE IF NOT EXISTS employees (
+            id SERIAL PRIMARY KEY,
+            name TEXT,
+            email TEXT NOT NULL,
+            leave_balance NUMERIC(6, 2) NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS leave_requests (
+            id SERIAL PRIMARY KEY,
+            employee_id INTEGER NOT NULL REFERENCES employees (id),
+            start_date DATE NOT NULL,
+            end_date DATE NOT NULL,
+            reason TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+    ]),
+    (2, "create email_outbox", OUTBOX_DDL),
+    (3, "performance indexes", [
+        # get_leave_balance / create_pending_leave_request look employees up by email.
+        "CREATE UNIQUE INDEX IF NOT EXISTS employees_email_uidx ON employees (email)",
+        # Per-employee request lists filtered by status.
+        "CREATE INDEX IF NOT EXISTS leave_requests_employee_status_idx ON leave_requests (employee_id, status)",
+        # The pending queue is small compared to the full history; keep its index small too.
+        "CREATE INDEX IF NOT EXISTS leave_requests_pending_idx ON leave_requests (employee_id, start_date) WHERE status = 'pending'",
+        # Duplicate detection in leave_import.py.
+        "CREATE INDEX IF NOT EXISTS leave_requests_employee_dates_idx ON leave_requests (employee_id, start_date, end_date)",
+    ]),
+    (4, "check constraints", [
+        _add_constraint("leave_requests", "leave_requests_dates_check", "CHECK (end_date >= start_date)"),
+        _add_constraint("leave_requests", "leave_requests_status_check", "CHECK (status IN ('pending', 'approved', 'rejected'))"),
+        _add_constraint("email_outbox", "email_outbox_status_check", "CHECK (status IN ('pending', 'sent', 'dead'))"),
+    ]),
+    (5, "manager emails and notification digests", [
+        "ALTER TABLE employees ADD COLUMN IF NOT EXISTS manager_email TEXT",
+        *DIGEST_DDL,
+    ]),
+    (6, "leave ledger and balance snapshots", LEDGER_DDL),
+    (7, "no leave balance before the first ledger entry", LEDGER_BALANCE_DDL),
+    # Validates the constraints added in 4. Databases that applied 4 when it still
+    # validated in the same transaction just re-check them.
+    (8, "validate check constraints", [
+        "ALTER TABLE leave_requests VALIDATE CONSTRAINT leave_requests_dates_check",
+        "ALTER TABLE leave_requests VALIDATE CONSTRAINT leave_requests_status_check",
+        "ALTER TABLE email_outbox VALIDATE CONSTRAINT email_outbox_status_check",
+    ]),
+]
+
+# Indexes the hot queries rely on; reported at startup when missing.
+REQUIRED_INDEXES = [
+    "employees_email_uidx",
+    "leave_requests_employee_status_idx",
+    "leave_requests_pending_idx",
+    "email_outbox_due_idx",
+    "leave_ledger_employee_date_idx",
+]
+
+
+def migrate() -> list[int]:
+    """
+    Applies every migration that has not run yet. Returns the versions applied.
+    """
+    with engine.begin() as connection:
+        connection.execute(text(SCHEMA_MIGRATIONS_DDL))
+        applied = set(connection.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+    newly_applied = []
+    for version, name, statements in MIGRATIONS:
+        if version in applied:
+            continue
+        with engine.begin() as connection:
+            connection.execute(text("SET LOCAL statement_timeout = 0"))
+            connection.execute(
+                text("SELECT set_config('lock_timeout', :timeout, true)"),
+                {"timeout": str(MIGRATION_LOCK_TIMEOUT_MS)},
+            )
+            for statement in statements:
+                connection.execute(text(statement))
+            connection.execute(
+                text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                {"version": version, "name": name},
+            )
+        logger.info("Applied migration %s: %s", version, name)
+        newly_applied.append(version)
+
+    if not newly_applied:
+        logger.info("Schema is up to date")
+    return newly_applied
+
+
+def check_schema() -> dict:
+    """
+    Returns pending migration versions and required indexes that do not exist.
+    """
+    with engine.connect() as connection:
+        has_migrations_table = connection.execute(text("SELECT to_regclass('schema_migrations') IS NOT NULL")).scalar()
+        applied = set()
+        if has_migrations_table:
+            applied = set(connection.execute(text("SELECT version FROM schema_migrations")).scalars())
+        existing = set(connection.execute(
+            text("SELECT indexname FROM pg_indexes WHERE indexname = ANY(:names)"),
+            {"names": REQUIRED_INDEXES},
+        ).scalars())
+
+    return {
+        "pending_migrations": [version for version, _, _ in MIGRATIONS if version not in applied],
+        "missing_indexes": [name for name in REQUIRED_INDEXES if name not in existing],
+    }
+
+
+def report_schema_status() -> None:
+    """
+    Logs a warning for every pending migration or missing index. Called at startup.
+    """
+    try:
+        status = check_schema()
+    except Exception:
+        logger.warning("Could not check the database schema", exc_info=True)
+        return
+
+    if status["pending_migrations"]:
+        logger.warning("Pending schema migrations %s. Run `python setup_database.py`.", status["pending_migrations"])
+    for index_name in status["missing_indexes"]:
+        logger.warning("Missing index %s; queries that rely on it will be slow.", index_name)
+    if not status["pending_migrations"] and not status["missing_indexes"]:
+        logger.info("Schema and indexes are in place")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create or migrate the leave management database schema.")
+    parser.add_argument("--check", action="store_true", help="Only report pending migrations and missing indexes")
+    args = parser.parse_args()
+
+    setup_logging()
+    if args.check:
+        report_schema_status()
+    else:
+        migrate()
@@ -0,0 +1,126 @@
+import asyncio
+import functools
+import inspect
+import threading
+
+# --- Single-Flight Coalescing ---
+# Concurrent calls with the same function and arguments share one execution:
+# the first caller runs it and every caller that arrives while it is in flight
+# receives the same result (or exception). Nothing is cached afterwards.
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight calls, for threads (do) and for coroutines (do_async).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Runs func(*args, **kwargs) unless a call with the same key is already
+        running in another thread, in which case waits for and returns its result.
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key, func, *args, **kwargs):
+        """
+        Awaits func(*args, **kwargs), sharing one task between concurrent callers with the same key.
+        A caller that is cancelled does not cancel the shared task.
+        """
+        with self._lock:
+            self.calls += 1
+            task = self._tasks.get(key)
+            if task is not None:
+                self.coalesced += 1
+            else:
+                task = self._tasks[key] = asyncio.ensure_future(func(*args, **kwargs))
+                self.executions += 1
+                task.add_done_callback(lambda _: self._forget(key, task))
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task) -> None:
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + len(self._tasks),
+            }
+
+
+single_flight = SingleFlight()
+
+
+def coalesced(func):
+    """
+    Decorator that routes a sync or async function through single_flight, keyed by
+    the function and its (hashable) arguments. Arguments are bound to the signature
+    first, so f("a"), f(x="a") and f("a", default) share a call. The signature is
+    kept, so decorated tools look the same to agents.
+    """
+    name = f"{func.__module__}.{func.__qualname__}"
+    signature = inspect.signature(func)
+
+    def call_key(args, kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = []
+        for parameter, value in bound.arguments.items():
+            if signature.parameters[parameter].kind is inspect.Parameter.VAR_KEYWORD:
+                value = frozenset(value.items())
+            arguments.append((parameter, value))
+        return (name, tuple(arguments))
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            return await single_flight.do_async(call_key(args, kwargs), func, *args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return single_flight.do(call_key(args, kwargs), func, *args, **kwargs)
+    return wrapper
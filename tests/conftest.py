@@ -0,0 +1,5 @@
+import os
+
+# db_config refuses to import without a password. Engines are created lazily and
+# never connect in these tests, so any value will do.
+os.environ.setdefault("DB_PASSWORD", "test")
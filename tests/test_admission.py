@@ -0,0 +1,56 @@
+import pytest
+
+from admission import AdmissionController, AdmissionRejected, TokenBucket
+
+
+def test_token_bucket_allows_burst_then_reports_wait():
+    bucket = TokenBucket(rate=2, burst=3, now=0.0)
+    assert [bucket.take(0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take(0.0) == pytest.approx(0.5)
+
+
+def test_token_bucket_refills_up_to_burst():
+    bucket = TokenBucket(rate=1, burst=2, now=0.0)
+    bucket.take(0.0)
+    bucket.take(0.0)
+    assert bucket.take(1.0) == 0.0
+    assert bucket.take(100.0) == 0.0
+    assert bucket.tokens == pytest.approx(1.0)
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    monkeypatch.setenv("CHAT_RATE_PER_USER", "0.001")
+    monkeypatch.setenv("CHAT_BURST_PER_USER", "2")
+    monkeypatch.setenv("CHAT_MAX_IN_FLIGHT", "3")
+    monkeypatch.setenv("CHAT_RATE_LIMIT_USERS", "2")
+    return AdmissionController()
+
+
+def test_rate_limits_each_user_separately(controller):
+    controller.admit("alice")()
+    controller.admit("alice")()
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("alice")
+    assert rejected.value.status_code == 429
+    assert rejected.value.retry_after >= 1
+    controller.admit("bob")()
+    assert controller.stats()["shed_rate_limited"] == 1
+
+
+def test_sheds_when_in_flight_limit_is_reached(controller):
+    releases = [controller.admit(user) for user in ("a", "b", "c")]
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("d")
+    assert rejected.value.status_code == 503
+
+    releases[0]()
+    releases[0]()  # releasing twice frees only one slot
+    assert controller.stats()["in_flight"] == 2
+    controller.admit("d")
+
+
+def test_tracked_users_are_bounded(controller):
+    for user in ("a", "b", "c"):
+        controller.admit(user)()
+    assert controller.stats()["tracked_users"] == 2
@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from google.adk.events import Event, EventActions
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+from opentelemetry import trace
+from opentelemetry.sdk.trace import SpanProcessor
+from sqlalchemy.exc import OperationalError
+
+import app as app_module
+from session_memory import session_memory
+
+
+def test_fast_path_reply_is_kept_in_the_session():
+    session_service = InMemorySessionService()
+    session_memory.attach(session_service, app_module.APP_NAME)
+
+    async def main():
+        await app_module.remember_fast_reply(session_service, "alice@example.com", "draft my leave email", "Dear manager, ...")
+        return await session_memory.get_session("alice@example.com")
+
+    session = asyncio.run(main())
+    assert [(event.author, event.content.parts[0].text) for event in session.events] == [
+        ("user", "draft my leave email"),
+        ("OrchestratorAgent", "Dear manager, ..."),
+    ]
+
+
+# --- Structured endpoints, with the database functions replaced ---
+
+
+@pytest.fixture
+def client():
+    # Without a `with` block the lifespan (schema check, workers) does not run.
+    return TestClient(app_module.app)
+
+
+def _returns(value):
+    async def function(*args, **kwargs):
+        return value
+    return function
+
+
+def test_balance(client, monkeypatch):
+    monkeypatch.setattr(app_module, "get_leave_balance", _returns(12.5))
+    response = client.get("/employees/alice@example.com/balance")
+    assert response.status_code == 200
+    assert response.json() == {"employee_email": "alice@example.com", "leave_balance": 12.5, "as_of": None}
+    assert response.headers["X-Request-ID"]
+
+
+def test_balance_before_the_ledger_is_not_found(client, monkeypatch):
+    monkeypatch.setattr(app_module, "get_leave_balance_as_of", _returns(None))
+    assert client.get("/employees/alice@example.com/balance", params={"as_of": "2001-01-01"}).status_code == 404
+
+
+def test_create_rejects_end_before_start(client):
+    response = client.post("/leave-requests", json={
+        "employee_email": "alice@example.com", "start_date": "2024-07-05", "end_date": "2024-07-01", "reason": "x",
+    })
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("balance, status_code", [(None, 404), (1.0, 422)])
+def test_create_rejections(client, monkeypatch, balance, status_code):
+    monkeypatch.setattr(app_module, "create_pending_leave_request", _returns(None))
+    monkeypatch.setattr(app_module, "get_leave_balance", _returns(balance))
+    response = client.post("/leave-requests", json={
+        "employee_email": "alice@example.com", "start_date": "2024-07-01", "end_date": "2024-07-05", "reason": "x",
+    })
+    assert response.status_code == status_code
+
+
+def test_decision(client, monkeypatch):
+    monkeypatch.setattr(app_module, "update_leave_status", _returns({"employee_email": "alice@example.com", "status": "approved"}))
+    response = client.post("/leave-requests/7/decision", json={"decision": "approved"})
+    assert response.json() == {"request_id": 7, "employee_email": "alice@example.com", "status": "approved"}
+
+    monkeypatch.setattr(app_module, "update_leave_status", _returns(None))
+    assert client.post("/leave-requests/7/decision", json={"decision": "approved"}).status_code == 404
+    assert client.post("/leave-requests/7/decision", json={"decision": "maybe"}).status_code == 422
+
+
+def test_database_outage_is_a_503(client, monkeypatch):
+    async def unavailable(*args, **kwargs):
+        raise OperationalError("SELECT 1", {}, Exception("connection refused"))
+
+    monkeypatch.setattr(app_module, "update_leave_status", unavailable)
+    response = client.post("/leave-requests/7/decision", json={"decision": "approved"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+class _CollectSpans(SpanProcessor):
+    def __init__(self):
+        self.spans = []
+
+    def on_end(self, span) -> None:
+        self.spans.append(span)
+
+
+def test_request_span_covers_the_streamed_body(client, monkeypatch):
+    spans = _CollectSpans()
+    trace.get_tracer_provider().add_span_processor(spans)
+    session_service = InMemorySessionService()
+    session_memory.attach(session_service, app_module.APP_NAME)
+    monkeypatch.setattr(app_module.app.state, "session_service", session_service, raising=False)
+
+    async def slow_reply(message, user_id):
+        await asyncio.sleep(0.2)
+        return "You have 12 days."
+
+    monkeypatch.setattr(app_module.intent_router, "try_handle", slow_reply)
+    response = client.post("/chat/stream", json={"message": "my balance", "user_id": "alice@example.com"})
+    assert response.status_code == 200
+    assert "You have 12 days." in response.text
+    assert response.headers["X-Request-ID"]
+
+    [span] = [span for span in spans.spans if span.name == "POST /chat/stream"]
+    assert (span.end_time - span.start_time) / 1e9 >= 0.2
+    assert span.attributes["http.status_code"] == 200
+
+
+def test_describe_event_reports_routing_tool_calls_and_text():
+    routing = Event(
+        author="OrchestratorAgent",
+        actions=EventActions(transfer_to_agent="BalanceCheckAgent"),
+        content=types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(
+            name="transfer_to_agent", args={"agent_name": "BalanceCheckAgent"},
+        ))]),
+    )
+    assert app_module.describe_event(routing) == [
+        {"type": "routing", "agent": "OrchestratorAgent", "to": "BalanceCheckAgent"},
+    ]
+
+    call = Event(author="BalanceCheckAgent", content=types.Content(role="model", parts=[types.Part(
+        function_call=types.FunctionCall(name="get_leave_balance", args={"employee_email": "a@x.com"}),
+    )]))
+    result = Event(author="BalanceCheckAgent", content=types.Content(role="user", parts=[types.Part(
+        function_response=types.FunctionResponse(name="get_leave_balance", response={"result": 12.0}),
+    )]))
+    assert app_module.describe_event(call) == [
+        {"type": "tool_call", "agent": "BalanceCheckAgent", "tool": "get_leave_balance", "args": {"employee_email": "a@x.com"}},
+    ]
+    assert app_module.describe_event(result) == [
+        {"type": "tool_result", "agent": "BalanceCheckAgent", "tool": "get_leave_balance", "result": {"result": 12.0}},
+    ]
+
+    chunk = Event(author="BalanceCheckAgent", partial=True, content=types.Content(role="model", parts=[types.Part(text="You have")]))
+    final = Event(author="BalanceCheckAgent", content=types.Content(role="model", parts=[types.Part(text="You have 12 days.")]))
+    assert app_module.describe_event(chunk) == [{"type": "text", "agent": "BalanceCheckAgent", "text": "You have"}]
+    assert app_module.describe_event(final) == [{"type": "message", "agent": "BalanceCheckAgent", "text": "You have 12 days."}]
@@ -0,0 +1,52 @@
+from cache import TTLCache
+
+
+def test_get_set_and_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=10, ttl=5)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    now[0] += 6
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_set_with_stale_generation_is_dropped():
+    cache = TTLCache(maxsize=10, ttl=60)
+    generation = cache.generation("a")
+    cache.invalidate("a")
+    assert cache.set("a", "old", generation) is False
+    assert cache.get("a") is None
+
+    generation = cache.generation("a")
+    assert cache.set("a", "new", generation) is True
+    assert cache.get("a") == "new"
+
+
+def test_generation_stays_stale_after_generations_are_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    generation = cache.generation("a")
+    cache.invalidate("a")
+    for key in ("b", "c", "d"):
+        cache.invalidate(key)
+    assert cache.set("a", "old", generation) is False
+
+
+def test_clear_makes_every_generation_stale():
+    cache = TTLCache(maxsize=10, ttl=60)
+    generation = cache.generation("a")
+    cache.clear()
+    assert cache.set("a", "old", generation) is False
@@ -0,0 +1,25 @@
+from datetime import date
+from types import SimpleNamespace
+
+from digest import render_digest
+
+
+def _event(kind, request_id):
+    return SimpleNamespace(
+        kind=kind, request_id=request_id, employee_email="jane@example.com",
+        start_date=date(2024, 7, 1), end_date=date(2024, 7, 5), reason="Wedding",
+    )
+
+
+def test_digest_lists_pending_and_decided_requests():
+    subject, body = render_digest("boss@example.com", [_event("pending", 1), _event("approved", 2), _event("rejected", 3)])
+    assert subject == "Leave digest: 1 pending, 2 decided"
+    assert "Hello boss@example.com" in body
+    assert "#1 jane@example.com, 2024-07-01 to 2024-07-05: Wedding" in body
+    assert "#2 jane@example.com, 2024-07-01 to 2024-07-05: approved" in body
+
+
+def test_digest_omits_empty_sections():
+    _, body = render_digest("boss@example.com", [_event("approved", 2)])
+    assert "awaiting your decision" not in body
+    assert "have been decided" in body
@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from email_client import AsyncSendGridClient, EmailSendError
+
+
+def _client(handler, **kwargs):
+    return AsyncSendGridClient(
+        "key", "hr@example.com", base_url="https://sendgrid.test", transport=httpx.MockTransport(handler), **kwargs
+    )
+
+
+def test_send_posts_the_v3_payload():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(202)
+
+    async def main():
+        client = _client(handler)
+        await client.send("jane@example.com", "Subject", "Body")
+        await client.aclose()
+        return client.stats()
+
+    stats = asyncio.run(main())
+    [request] = requests
+    assert request.url == "https://sendgrid.test/v3/mail/send"
+    assert request.headers["Authorization"] == "Bearer key"
+    assert json.loads(request.content) == {
+        "personalizations": [{"to": [{"email": "jane@example.com"}]}],
+        "from": {"email": "hr@example.com"},
+        "subject": "Subject",
+        "content": [{"type": "text/plain", "value": "Body"}],
+    }
+    assert stats["sent"] == 1 and stats["failed"] == 0 and stats["in_flight"] == 0
+
+
+def test_rejected_send_raises_and_counts_a_failure():
+    async def main():
+        client = _client(lambda request: httpx.Response(400))
+        with pytest.raises(EmailSendError):
+            await client.send("jane@example.com", "Subject", "Body")
+        await client.aclose()
+        return client.stats()
+
+    assert asyncio.run(main())["failed"] == 1
+
+
+def test_sends_are_bounded_by_max_concurrency():
+    active = peak = 0
+
+    async def handler(request):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return httpx.Response(202)
+
+    async def main():
+        client = _client(handler, max_concurrency=3)
+        await asyncio.gather(*(client.send(f"user{i}@example.com", "Subject", "Body") for i in range(10)))
+        await client.aclose()
+        return client.stats()
+
+    assert asyncio.run(main())["sent"] == 10
+    assert peak == 3
+
+
+def test_slow_sends_time_out():
+    async def handler(request):
+        await asyncio.sleep(1)
+        return httpx.Response(202)
+
+    async def main():
+        client = _client(handler, timeout=0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await client.send("jane@example.com", "Subject", "Body")
+        await client.aclose()
+
+    asyncio.run(main())
@@ -0,0 +1,31 @@
+import pytest
+
+from intent_router import IntentRouter
+
+
+@pytest.mark.parametrize("message", [
+    "what is my leave balance",
+    "check my leave balance",
+    "How many vacation days are left?",
+    "how many leave days do I have left",
+    "leave balance for jane@example.com",
+])
+def test_balance_requests(message):
+    assert IntentRouter().classify(message) == "balance"
+
+
+def test_draft_requests():
+    message = "Draft a leave email for jane@example.com from 2024-07-01 to 2024-07-05 because of a wedding"
+    assert IntentRouter().classify(message) == "draft_email"
+
+
+@pytest.mark.parametrize("message", [
+    "how many days until my leave starts, do I have to fill a form",
+    "What is the balance between work and life?",
+    "Do not check my balance",
+    "send the email to my manager",
+    "make it shorter",
+    "hello",
+])
+def test_everything_else_falls_through(message):
+    assert IntentRouter().classify(message) is None
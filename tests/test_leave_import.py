@@ -0,0 +1,38 @@
+from datetime import date
+
+from leave_import import validate_row
+
+
+def test_valid_row_is_parsed():
+    row = {"employee_email": " jane@example.com ", "start_date": "2024-07-01", "end_date": "2024-07-05", "status": "Approved"}
+    parsed, error = validate_row(row)
+    assert error is None
+    assert parsed == {
+        "employee_email": "jane@example.com",
+        "start_date": date(2024, 7, 1),
+        "end_date": date(2024, 7, 5),
+        "reason": "",
+        "status": "approved",
+    }
+
+
+def test_status_defaults_to_pending():
+    parsed, _ = validate_row({"employee_email": "a@x.com", "start_date": "2024-07-01", "end_date": "2024-07-01"})
+    assert parsed["status"] == "pending"
+
+
+def test_invalid_rows_report_why():
+    base = {"employee_email": "a@x.com", "start_date": "2024-07-01", "end_date": "2024-07-05"}
+    assert validate_row({**base, "employee_email": ""}) == (None, "employee_email is required")
+    assert validate_row({**base, "start_date": "01/07/2024"}) == (None, "start_date and end_date must be YYYY-MM-DD dates")
+    assert validate_row({**base, "end_date": "2024-06-30"}) == (None, "end_date is before start_date")
+    assert validate_row({**base, "status": "maybe"})[1].startswith("status must be one of")
+    assert validate_row({"_error": "line 3: bad JSON"}) == (None, "line 3: bad JSON")
+
+
+def test_non_string_json_values_are_row_errors():
+    base = {"employee_email": "a@x.com", "start_date": "2024-07-01", "end_date": "2024-07-05"}
+    assert validate_row({**base, "start_date": 20240701}) == (None, "start_date must be a string")
+    assert validate_row({**base, "employee_email": 42}) == (None, "employee_email must be a string")
+    assert validate_row({**base, "status": ["approved"]}) == (None, "status must be a string")
+    assert validate_row({**base, "reason": {"text": "wedding"}}) == (None, "reason must be a string")
@@ -0,0 +1,44 @@
+import pytest
+
+from loadtest.run import compare, parse_mix, percentile, summarise
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.95) == 95
+    assert percentile(values, 1.0) == 100
+    assert percentile([7], 0.99) == 7
+    assert percentile([], 0.95) == 0.0
+
+
+def test_summarise_reports_milliseconds_and_error_rate():
+    stats = summarise([0.3, 0.1, 0.2, 0.4], errors=1, elapsed=2.0)
+    assert stats["requests"] == 4
+    assert stats["error_rate"] == 0.25
+    assert stats["throughput_rps"] == 2.0
+    assert stats["p50_ms"] == pytest.approx(200)
+    assert stats["max_ms"] == pytest.approx(400)
+
+
+def test_parse_mix_defaults_weights_to_one():
+    assert parse_mix("chat_balance=4, rest_decide") == {"chat_balance": 4.0, "rest_decide": 1.0}
+
+
+def _report(**scenarios):
+    return {"scenarios": {name: {"p95_ms": p95, "error_rate": error_rate} for name, (p95, error_rate) in scenarios.items()}}
+
+
+def test_compare_flags_latency_and_error_regressions():
+    baseline = _report(chat=(100.0, 0.01), rest=(10.0, 0.0))
+    current = _report(chat=(125.0, 0.01), rest=(10.5, 0.05), new=(999.0, 1.0))
+    regressions = compare(current, baseline, max_regression=0.2, max_error_increase=0.01)
+    assert regressions == [
+        "chat: p95 125.0 ms vs baseline 100.0 ms",
+        "rest: error rate 5.00% vs baseline 0.00%",
+    ]
+
+
+def test_compare_within_tolerance_is_clean():
+    baseline = _report(chat=(100.0, 0.01))
+    assert compare(_report(chat=(119.0, 0.015)), baseline, max_regression=0.2, max_error_increase=0.01) == []
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from agents.model_backend import _ReplayIndex, request_key
+
+
+def _request(*parts, instruction="Send emails."):
+    return LlmRequest(
+        model="gemini-2.0-flash",
+        contents=[types.Content(role="user", parts=[part]) for part in parts],
+        config=types.GenerateContentConfig(system_instruction=instruction),
+    )
+
+
+def _send_result(call_id, outbox_id):
+    return types.Part(function_response=types.FunctionResponse(
+        id=call_id, name="send_email",
+        response={"result": f"The email to a@x.com has been queued for delivery (reference #{outbox_id})."},
+    ))
+
+
+def test_key_ignores_call_ids_and_outbox_references():
+    first = request_key(_request(types.Part(text="send it"), _send_result("call-1", 17)))
+    second = request_key(_request(types.Part(text="send it"), _send_result("call-2", 9123)))
+    assert first == second
+
+
+def test_key_changes_with_the_question():
+    assert request_key(_request(types.Part(text="send it"))) != request_key(_request(types.Part(text="draft it")))
+    assert request_key(_request(types.Part(text="send it"))) != request_key(
+        _request(types.Part(text="send it"), instruction="Draft emails.")
+    )
+
+
+def test_replay_index_serves_recordings_in_order_then_wraps(tmp_path):
+    path = tmp_path / "recordings.jsonl"
+    records = [{"key": "a", "n": 1}, {"key": "b", "n": 2}, {"key": "a", "n": 3}]
+    path.write_text("\n".join(json.dumps(record) for record in records) + "\n\n")
+
+    index = _ReplayIndex(str(path))
+    assert [index.next_record("a")["n"] for _ in range(3)] == [1, 3, 1]
+    assert index.next_record("b")["n"] == 2
+    with pytest.raises(LookupError):
+        index.next_record("missing")
@@ -0,0 +1,71 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from outbox import CLAIM_BATCH_QUERY, MARK_FAILED_QUERY, MARK_SENT_QUERY, OutboxWorker
+
+
+class FakeEngine:
+    """
+    Serves a fixed batch to CLAIM_BATCH_QUERY and records every other statement.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    @asynccontextmanager
+    async def begin(self):
+        yield self
+
+    async def execute(self, statement, params=None):
+        if statement is CLAIM_BATCH_QUERY:
+            rows, self.rows = self.rows, []
+            return SimpleNamespace(all=lambda: rows)
+        self.executed.append((statement, params))
+
+
+def _row(outbox_id, recipient, attempts=1):
+    return SimpleNamespace(id=outbox_id, recipient=recipient, subject="Subject", body="Body", attempts=attempts)
+
+
+@pytest.fixture
+def worker_env(monkeypatch):
+    monkeypatch.setenv("OUTBOX_BACKOFF_BASE", "5")
+    monkeypatch.setenv("OUTBOX_BACKOFF_MAX", "60")
+    monkeypatch.setenv("OUTBOX_MAX_ATTEMPTS", "3")
+
+
+def test_backoff_doubles_with_jitter_up_to_the_cap(worker_env):
+    worker = OutboxWorker(engine=None, deliver=None)
+    for attempts, expected in ((1, 5), (2, 10), (3, 20), (10, 60)):
+        assert expected * 0.8 <= worker._backoff(attempts) <= expected * 1.2
+
+
+def test_drain_once_marks_sent_and_failed_emails(worker_env):
+    engine = FakeEngine([_row(1, "ok@x.com"), _row(2, "bad@x.com"), _row(3, "bad@x.com", attempts=3)])
+    delivered = []
+
+    async def deliver(recipient, subject, body):
+        if recipient == "bad@x.com":
+            raise RuntimeError("rejected")
+        delivered.append(recipient)
+
+    worker = OutboxWorker(engine, deliver)
+    assert asyncio.run(worker.drain_once()) == 3
+    assert delivered == ["ok@x.com"]
+
+    statements = dict((statement, params) for statement, params in engine.executed)
+    assert statements[MARK_SENT_QUERY] == {"ids": [1]}
+    failures = statements[MARK_FAILED_QUERY]
+    assert [failure["id"] for failure in failures] == [2, 3]
+    assert all(failure["error"] == "rejected" and failure["max_attempts"] == 3 for failure in failures)
+    assert worker.stats() == {"sent": 1, "failed": 2, "dead_lettered": 1}
+
+
+def test_drain_once_with_nothing_due(worker_env):
+    engine = FakeEngine([])
+    assert asyncio.run(OutboxWorker(engine, deliver=None).drain_once()) == 0
+    assert engine.executed == []
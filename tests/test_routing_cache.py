@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+from google.genai import types
+
+from agents.routing_cache import RoutingCache, normalise_message
+
+
+def test_normalise_message_masks_details():
+    assert normalise_message("What's the balance for Jane.Doe@Example.com on 2024-05-01?") == (
+        "what s the balance for <email> on <date>"
+    )
+    assert normalise_message("  Approve   request 42!! ") == "approve request <n>"
+
+
+def _context():
+    agent = SimpleNamespace(model="gemini", instruction="route", sub_agents=[SimpleNamespace(name="email_agent")])
+    return SimpleNamespace(_invocation_context=SimpleNamespace(agent=agent), invocation_id="1")
+
+
+def _request(*turns):
+    return SimpleNamespace(contents=[types.Content(role=role, parts=[types.Part(text=text)]) for role, text in turns])
+
+
+def test_follow_ups_are_keyed_on_the_previous_turn():
+    cache = RoutingCache()
+    after_draft = cache._key(_context(), _request(("user", "draft my leave email"), ("model", "Here is your draft."), ("user", "yes")))
+    after_balance = cache._key(_context(), _request(("user", "my balance?"), ("model", "You have 12 days."), ("user", "yes")))
+    first_turn = cache._key(_context(), _request(("user", "yes")))
+    assert len({after_draft, after_balance, first_turn}) == 3
+
+
+def test_rephrasings_of_the_same_turn_share_a_key():
+    cache = RoutingCache()
+    first = cache._key(_context(), _request(("model", "Hi!"), ("user", "Balance for a@x.com?")))
+    second = cache._key(_context(), _request(("model", "hi"), ("user", "balance for b@y.org")))
+    assert first == second
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+from google.genai import types
+
+from session_memory import SUMMARY_PREFIX, SessionMemory
+
+
+def _text(role, text):
+    return types.Content(role=role, parts=[types.Part(text=text)])
+
+
+def _context(user_id="alice"):
+    session = SimpleNamespace(user_id=user_id, events=[])
+    return SimpleNamespace(_invocation_context=SimpleNamespace(session=session))
+
+
+def _memory(monkeypatch, token_budget, summary_budget):
+    monkeypatch.setenv("CHAT_HISTORY_TOKEN_BUDGET", str(token_budget))
+    monkeypatch.setenv("CHAT_SUMMARY_TOKEN_BUDGET", str(summary_budget))
+    return SessionMemory()
+
+
+def test_history_within_budget_is_untouched(monkeypatch):
+    memory = _memory(monkeypatch, token_budget=1000, summary_budget=100)
+    contents = [_text("user", "hi"), _text("model", "hello")]
+    request = SimpleNamespace(contents=list(contents))
+    assert memory.trim_history(_context(), request) is None
+    assert request.contents == contents
+
+
+def test_old_turns_are_folded_into_a_summary(monkeypatch):
+    memory = _memory(monkeypatch, token_budget=60, summary_budget=20)
+    contents = [_text("user" if i % 2 == 0 else "model", f"message {i} " + "x" * 60) for i in range(6)]
+    request = SimpleNamespace(contents=list(contents))
+    memory.trim_history(_context(), request)
+
+    assert request.contents[0].parts[0].text.startswith(SUMMARY_PREFIX)
+    assert request.contents[-1] is contents[-1]
+    assert memory.stats()["sessions"]["tokens_trimmed_total"] > 0
+
+
+def test_tool_response_stays_with_its_call(monkeypatch):
+    memory = _memory(monkeypatch, token_budget=40, summary_budget=10)
+    call = types.Content(role="model", parts=[types.Part(
+        function_call=types.FunctionCall(name="get_leave_balance", args={"employee_email": "a" * 100 + "@x.com"})
+    )])
+    response = types.Content(role="user", parts=[types.Part(
+        function_response=types.FunctionResponse(name="get_leave_balance", response={"result": 12})
+    )])
+    contents = [_text("user", "x" * 200), call, response, _text("model", "You have 12 days.")]
+    request = SimpleNamespace(contents=list(contents))
+    memory.trim_history(_context(), request)
+
+    # The budget ends between the call and its response, so the response is summarised too.
+    assert request.contents[1:] == [contents[-1]]
+
+
+def test_stats_publish_aggregates_not_user_ids(monkeypatch):
+    memory = _memory(monkeypatch, token_budget=1000, summary_budget=100)
+    for user_id, words in (("alice@example.com", 10), ("bob@example.com", 100), ("carol@example.com", 1000)):
+        memory.trim_history(_context(user_id), SimpleNamespace(contents=[_text("user", "word " * words)]))
+
+    stats = memory.stats()
+    assert "example.com" not in str(stats)
+    assert stats["sessions"]["tracked"] == 3
+    assert stats["sessions"]["model_calls"] == 3
+    assert stats["sessions"]["last_prompt_tokens_max"] == stats["sessions"]["last_prompt_tokens_p95"] > stats["sessions"]["last_prompt_tokens_p50"]
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight, coalesced, single_flight
+
+
+def test_concurrent_threads_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.1)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", load))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("key", fail)
+    assert flight.do("key", lambda: "ok") == "ok"
+
+
+def test_concurrent_coroutines_share_one_task():
+    flight = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("key", load) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["value"] * 5
+    assert len(calls) == 1
+
+
+def test_coalesced_normalises_positional_keyword_and_default_arguments():
+    calls = []
+
+    @coalesced
+    def load(email, as_of="today"):
+        calls.append((email, as_of))
+        time.sleep(0.1)
+        return email
+
+    invocations = [lambda: load("a@x.com"), lambda: load(email="a@x.com"), lambda: load("a@x.com", "today")]
+    threads = [threading.Thread(target=invocation) for invocation in invocations]
+    before = single_flight.stats()["coalesced"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [("a@x.com", "today")]
+    assert single_flight.stats()["coalesced"] - before == 2
@@ -0,0 +1,98 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BoundedToolPool:
+    """
+    Runs blocking (sync) tools on a dedicated, size-limited thread pool so they
+    never stall the event loop. Tracks queue depth and time spent waiting for a worker.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-tool")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._started = 0
+        self._completed = 0
+        self._failed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Runs func(*args, **kwargs) on the pool and awaits its result.
+        """
+        enqueued_at = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+
+        def call():
+            wait = time.perf_counter() - enqueued_at
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._started += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                with self._lock:
+                    self._failed += 1
+                raise
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+            return result
+
+        # Copy the caller's context so context variables survive the hop to the worker thread.
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, context.run, call)
+
+    def wrap(self, func):
+        """
+        Returns an async version of a sync tool that runs on this pool.
+        The name, docstring and signature are kept so agents see the same tool.
+        """
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await self.run(func, *args, **kwargs)
+
+        return wrapper
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_wait_seconds": self._total_wait / self._started if self._started else 0.0,
+                "max_wait_seconds": self._max_wait,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+# Separate pools so a slow SendGrid call can never hold up database tools.
+db_tool_pool = BoundedToolPool("db", int(os.getenv("DB_TOOL_POOL_SIZE", "8")))
+email_tool_pool = BoundedToolPool("email", int(os.getenv("EMAIL_TOOL_POOL_SIZE", "4")))
+
+
+def tool_pool_stats() -> dict:
+    """
+    Returns queue depth and wait-time metrics for every tool pool.
+    """
+    return {pool.name: pool.stats() for pool in (db_tool_pool, email_tool_pool)}
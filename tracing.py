@@ -0,0 +1,195 @@
+import functools
+import inspect
+import json
+import os
+import threading
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.trace import Status, StatusCode
+from sqlalchemy import event
+
+import metrics
+
+# --- Tracing ---
+# OpenTelemetry spans for HTTP requests, agent runs, LLM calls, tools, database
+# and email functions, and every SQL statement. ADK emits its own agent, LLM and
+# tool spans; this module adds the rest. Span durations always feed the per-type
+# latency histograms served under "span_latency" in /metrics. With
+# TRACE_EXPORTER=jsonl, finished spans are also appended as JSON Lines to
+# TRACE_EXPORT_PATH. The file is never rotated, so that is off by default and
+# meant for profiling sessions.
+
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "traces.jsonl")
+SQL_STATEMENT_MAX_LENGTH = 500
+
+tracer = trace.get_tracer("leave_management")
+
+# ADK names its spans "invoke_agent <name>" (older releases: "agent_run [<name>]"),
+# "call_llm" and "execute_tool <name>".
+_ADK_SPAN_TYPES = (
+    ("invoke_agent", "agent"),
+    ("agent_run", "agent"),
+    ("call_llm", "llm"),
+    ("execute_tool", "tool"),
+    ("invocation", "invocation"),
+)
+
+
+def span_type(span) -> str:
+    """
+    Returns the latency bucket a finished span belongs to.
+    """
+    kind = (span.attributes or {}).get("span.type")
+    if kind:
+        return kind
+    for prefix, kind in _ADK_SPAN_TYPES:
+        if span.name.startswith(prefix):
+            return kind
+    return "other"
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """
+    Appends finished spans to a local file, one JSON document per line.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans) -> SpanExportResult:
+        lines = "".join(json.dumps(json.loads(span.to_json())) + "\n" for span in spans)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as output:
+                output.write(lines)
+        except OSError:
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+class LatencyHistogramProcessor(SpanProcessor):
+    """
+    Records the duration of every finished span in a histogram per span type.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def on_end(self, span) -> None:
+        if span.start_time is None or span.end_time is None:
+            return
+        kind = span_type(span)
+        with self._lock:
+            histogram = self.histograms.get(kind)
+            if histogram is None:
+                histogram = self.histograms[kind] = metrics.Histogram()
+        histogram.observe((span.end_time - span.start_time) / 1e9)
+
+    def stats(self) -> dict:
+        with self._lock:
+            histograms = dict(self.histograms)
+        return {kind: histogram.stats() for kind, histogram in sorted(histograms.items())}
+
+
+latency_processor = LatencyHistogramProcessor()
+_configured = False
+
+
+def configure() -> None:
+    """
+    Installs the tracer provider. Safe to call more than once.
+    """
+    global _configured
+    if _configured:
+        return
+    provider = TracerProvider(resource=Resource.create({"service.name": "leave_management"}))
+    provider.add_span_processor(latency_processor)
+    if TRACE_EXPORTER == "jsonl":
+        provider.add_span_processor(BatchSpanProcessor(JsonLinesSpanExporter(TRACE_EXPORT_PATH)))
+    elif TRACE_EXPORTER != "none":
+        raise ValueError(f"Unknown TRACE_EXPORTER: {TRACE_EXPORTER}")
+    trace.set_tracer_provider(provider)
+    _configured = True
+
+
+def shutdown() -> None:
+    """
+    Flushes spans that are still buffered.
+    """
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+
+
+def latency_stats() -> dict:
+    return latency_processor.stats()
+
+
+def traced(kind: str):
+    """
+    Decorator that runs a sync or async function inside a span of the given type.
+    The signature and docstring are kept, so decorated tools look the same to agents.
+    """
+    def decorator(func):
+        name = f"{kind} {func.__name__}"
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.start_as_current_span(name, attributes={"span.type": kind}):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(name, attributes={"span.type": kind}):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def instrument_engine(engine) -> None:
+    """
+    Opens a "sql" span around every statement the engine executes.
+    Accepts both sync engines and AsyncEngine.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_statement(conn, cursor, statement, parameters, context, executemany):
+        if context is None:
+            return
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+        context._trace_span = tracer.start_span(f"sql {operation}", attributes={
+            "span.type": "sql",
+            "db.system": "postgresql",
+            "db.statement": statement[:SQL_STATEMENT_MAX_LENGTH],
+            "db.executemany": executemany,
+        })
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def end_statement(conn, cursor, statement, parameters, context, executemany):
+        span = getattr(context, "_trace_span", None)
+        if span is not None:
+            if cursor is not None and cursor.rowcount is not None and cursor.rowcount >= 0:
+                span.set_attribute("db.rowcount", cursor.rowcount)
+            span.end()
+            context._trace_span = None
+
+    @event.listens_for(sync_engine, "handle_error")
+    def fail_statement(exception_context):
+        span = getattr(exception_context.execution_context, "_trace_span", None)
+        if span is not None:
+            span.record_exception(exception_context.original_exception)
+            span.set_status(Status(StatusCode.ERROR, str(exception_context.original_exception)))
+            span.end()
+            exception_context.execution_context._trace_span = None